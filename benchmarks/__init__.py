@@ -0,0 +1 @@
+"""Benchmarks for the simulator and learners."""
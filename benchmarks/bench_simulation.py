@@ -0,0 +1,168 @@
+"""Throughput benchmark for TrafficSimulation.run_headless.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_simulation --output bench.json
+    python -m benchmarks.bench_simulation --baseline bench.json
+
+Every scenario (model x traffic generator x spawn density x run length) is
+warmed up, then timed `repeats` times from a fixed seed. A separate run under
+tracemalloc records peak Python memory. Results are written as JSON; with
+--baseline, scenarios whose median steps/sec dropped by more than --tolerance
+are reported and the script exits with status 1.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from entities.intersection import IntersectionConfig
+from models.fixed_cycle import FixedCycleModel
+from traffic.random_traffic import RandomTrafficGenerator
+from traffic.pattern_traffic import PatternedTrafficGenerator
+from simulation import TrafficSimulation
+from event_simulation import EventDrivenSimulation
+from utils.parallel import seed_everything
+
+ENGINES = {'tick': TrafficSimulation, 'event': EventDrivenSimulation}
+
+def make_model(name, config):
+    if name == 'fixed':
+        return FixedCycleModel(config)
+    from models.neural_network import NeuralNetworkModel
+    return NeuralNetworkModel(config)
+
+def make_generator(name, config, density):
+    if name == 'random':
+        return RandomTrafficGenerator(config, spawn_prob=density)
+    generator = PatternedTrafficGenerator(config)
+    generator.base_spawn_prob = density
+    return generator
+
+def scenario_key(scenario):
+    return '{engine}/{model}/{generator}/p={density}/steps={steps}'.format(**scenario)
+
+def run_once(scenario, seed):
+    """Build a fresh simulation from seed and time run_headless, returns (seconds, sim)"""
+    config = IntersectionConfig()
+    seed_everything(seed)
+    model = make_model(scenario['model'], config)
+    generator = make_generator(scenario['generator'], config, scenario['density'])
+    sim = ENGINES[scenario['engine']](model, generator, config)
+
+    start = time.perf_counter()
+    sim.run_headless(steps=scenario['steps'])
+    return time.perf_counter() - start, sim
+
+def bench_scenario(scenario, seed, repeats, warmup_steps):
+    run_once(dict(scenario, steps=warmup_steps), seed)
+
+    timings = []
+    for _ in range(repeats):
+        elapsed, sim = run_once(scenario, seed)
+        timings.append(elapsed)
+
+    tracemalloc.start()
+    run_once(scenario, seed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rates = [scenario['steps'] / t for t in timings]
+    return {
+        'scenario': scenario,
+        'timings': timings,
+        'steps_per_sec': {
+            'median': statistics.median(rates),
+            'min': min(rates),
+            'max': max(rates),
+        },
+        'peak_memory_bytes': peak,
+        'cars_exited': sim.cars_exited,
+        'collision_count': sim.collision_count,
+    }
+
+def machine_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    info = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+    if 'torch' in sys.modules:
+        info['torch'] = sys.modules['torch'].__version__
+    return info
+
+def compare(results, baseline, tolerance):
+    """Return (key, baseline rate, current rate) for every scenario that got slower than tolerance allows"""
+    previous = {scenario_key(r['scenario']): r['steps_per_sec']['median'] for r in baseline['results']}
+    regressions = []
+    for result in results:
+        key = scenario_key(result['scenario'])
+        if key not in previous:
+            continue
+        rate = result['steps_per_sec']['median']
+        if rate < previous[key] * (1 - tolerance):
+            regressions.append((key, previous[key], rate))
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--engines', nargs='+', default=['tick'], choices=sorted(ENGINES))
+    parser.add_argument('--models', nargs='+', default=['fixed', 'neural'], choices=['fixed', 'neural'])
+    parser.add_argument('--generators', nargs='+', default=['random', 'patterned'], choices=['random', 'patterned'])
+    parser.add_argument('--densities', nargs='+', type=float, default=[0.1, 0.2, 0.4])
+    parser.add_argument('--steps', nargs='+', type=int, default=[200, 1000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--warmup-steps', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='allowed relative drop in median steps/sec before flagging a regression')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [
+        {'engine': engine, 'model': model, 'generator': generator, 'density': density, 'steps': steps}
+        for engine, model, generator, density, steps in itertools.product(
+            args.engines, args.models, args.generators, args.densities, args.steps)
+    ]
+
+    results = []
+    for scenario in scenarios:
+        result = bench_scenario(scenario, args.seed, args.repeats, args.warmup_steps)
+        results.append(result)
+        print(f"{scenario_key(scenario):<48} {result['steps_per_sec']['median']:>10.0f} steps/sec "
+              f"{result['peak_memory_bytes'] / 2**20:>8.2f} MiB peak")
+
+    report = {'machine': machine_info(), 'seed': args.seed, 'repeats': args.repeats, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before:.0f} -> {after:.0f} steps/sec ({after / before - 1:+.1%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Startup budget for headless runs.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget 0.5 --repeats 10
+
+Each repeat starts a fresh interpreter that times `import simulation` and a
+100-step FixedCycleModel run_headless, and reports which heavy packages got
+imported along the way. The script exits with status 1 if the median total
+exceeds --budget seconds or if matplotlib or torch were imported, since
+neither is needed for a fixed-cycle headless run.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('matplotlib', 'torch')
+
+# Runs in the child interpreter; prints one JSON line
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import simulation
+imported = time.perf_counter()
+from entities.intersection import IntersectionConfig
+from models.fixed_cycle import FixedCycleModel
+from traffic.random_traffic import RandomTrafficGenerator
+config = IntersectionConfig()
+sim = simulation.TrafficSimulation(FixedCycleModel(config), RandomTrafficGenerator(config), config)
+sim.run_headless(steps={steps})
+done = time.perf_counter()
+print(json.dumps({{
+    'import': imported - start,
+    'run': done - imported,
+    'total': done - start,
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+def measure(steps):
+    code = _CHILD.format(steps=steps, heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--steps', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='allowed median seconds for the import plus the headless run')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    runs = [measure(args.steps) for _ in range(args.repeats)]
+
+    for phase in ('import', 'run', 'total'):
+        times = [run[phase] for run in runs]
+        print(f"{phase:<8}median {statistics.median(times) * 1000:>8.1f} ms   "
+              f"min {min(times) * 1000:>8.1f} ms   max {max(times) * 1000:>8.1f} ms")
+
+    status = 0
+    heavy = sorted({name for run in runs for name in run['heavy_modules']})
+    if heavy:
+        print(f"FAIL imported {', '.join(heavy)} for a fixed-cycle headless run")
+        status = 1
+    total = statistics.median(run['total'] for run in runs)
+    if total > args.budget:
+        print(f"FAIL median startup {total:.3f}s exceeds the {args.budget:.3f}s budget")
+        status = 1
+    if status == 0:
+        print(f"OK within the {args.budget:.3f}s budget")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
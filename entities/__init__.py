@@ -1,6 +1,8 @@
 """Simulation entities package."""
 
-from .car import Car
+from .car import Car, CarPool
 from .intersection import IntersectionConfig
+from .routes import RouteTable
+from .vehicle_store import VehicleStore
 
-__all__ = ['Car', 'IntersectionConfig']
\ No newline at end of file
+__all__ = ['Car', 'CarPool', 'IntersectionConfig', 'RouteTable', 'VehicleStore']
\ No newline at end of file
@@ -1,48 +1,82 @@
 import numpy as np
 
 class Car:
+    """A vehicle, identified by its route in the config's RouteTable.
+
+    Everything that only depends on the route (start, end, velocity, number
+    of moves, color, names) lives in the shared table, so a car only holds
+    its route id, position, move count and finished flag. origin, lane,
+    target, color and cardinal_direction are looked up on access.
+    """
+    __slots__ = ('routes', 'route', 'position', 'moves', 'finished')
+
     def __init__(self, origin, lane, config):
-        self.origin = origin
-        self.lane = lane
-        self.config = config
-        self.target = config.turn_targets[(origin, lane)]
-        self.color = config.shade_colors[(origin, lane)]
+        routes = config.route_table()
+        self._start(routes, routes.index[(origin, lane)], np.empty(2))
+
+    @classmethod
+    def from_route(cls, routes, route):
+        car = cls.__new__(cls)
+        car._start(routes, route, np.empty(2))
+        return car
+
+    def _start(self, routes, route, position):
+        self.routes = routes
+        self.route = route
+        self.position = position
+        self.position[:] = routes.starts[route]
+        self.moves = 0
         self.finished = False
-        self.position = np.array(config.lane_positions[origin][lane], dtype=float)
-        self.velocity = np.zeros(2)  # Initialize velocity vector
-        self.cardinal_direction = self._get_cardinal_direction()
-
-    def _get_cardinal_direction(self):
-        """Determine cardinal direction based on origin"""
-        if self.origin == 'N':
-            return 'S'  # Moving southward
-        elif self.origin == 'S':
-            return 'N'  # Moving northward
-        elif self.origin == 'E':
-            return 'W'  # Moving westward
-        else:  # 'W'
-            return 'E'  # Moving eastward
-
-    def _mirror_lane(self):
-        if self.lane == 'right' or self.lane == 'straight_forward':
-            return 'straight_back2'
-        return 'straight_back'
+
+    @property
+    def origin(self):
+        return self.routes.keys[self.route][0]
+
+    @property
+    def lane(self):
+        return self.routes.keys[self.route][1]
+
+    @property
+    def target(self):
+        return self.routes.targets[self.route]
+
+    @property
+    def color(self):
+        return self.routes.colors[self.route]
+
+    @property
+    def cardinal_direction(self):
+        return self.routes.travel[self.route]
+
+    @property
+    def velocity(self):
+        return np.zeros(2) if self.finished else self.routes.velocities[self.route]
 
     def move(self):
-        target_lane = self._mirror_lane()
-        try:
-            target_pos = np.array(self.config.lane_positions[self.target][target_lane])
-            direction = target_pos - self.position
-            distance = np.linalg.norm(direction)
-            
-            # Update velocity vector
-            self.velocity = self.config.car_speed * direction / distance if distance > 0 else np.zeros(2)
-            
-            if distance < self.config.car_speed:
-                self.position = target_pos
-                self.finished = True
-            else:
-                self.position += self.velocity
-        except KeyError:
-            print(f"Error: No target position for {self.origin} {self.lane} -> {self.target} {target_lane}")
-            self.finished = True
\ No newline at end of file
+        routes = self.routes
+        self.moves += 1
+        if self.moves >= routes.step_counts[self.route]:
+            self.position[:] = routes.ends[self.route]
+            self.finished = True
+        else:
+            self.position += routes.velocities[self.route]
+
+class CarPool:
+    """Recycles finished cars so that spawning reuses them instead of allocating.
+
+    release() cars once nothing refers to them any more; acquire() hands them
+    out again reset to the start of the requested route.
+    """
+    def __init__(self, config):
+        self.routes = config.route_table()
+        self.free = []
+
+    def acquire(self, route):
+        if self.free:
+            car = self.free.pop()
+            car._start(self.routes, route, car.position)
+            return car
+        return Car.from_route(self.routes, route)
+
+    def release(self, cars):
+        self.free.extend(cars)
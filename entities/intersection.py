@@ -1,3 +1,5 @@
+from .routes import RouteTable
+
 class IntersectionConfig:
     def __init__(self):
         # Simulation parameters
@@ -122,4 +124,12 @@ class IntersectionConfig:
                 'left': (-4.5, -1.0),
                 'straight': (-4.5, 0.0)
             }
-        }
\ No newline at end of file
+        }
+
+        self._route_table = None
+
+    def route_table(self):
+        """RouteTable for this config, built on first use and shared afterwards"""
+        if self._route_table is None:
+            self._route_table = RouteTable(self)
+        return self._route_table
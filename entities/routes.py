@@ -0,0 +1,70 @@
+import numpy as np
+
+# Heading codes count quarter turns counter-clockwise from east (E=0, N=90, W=180, S=270)
+HEADINGS = ['E', 'N', 'W', 'S']
+
+def _angle_difference(code1, code2):
+    diff = abs(code1 - code2) * 90
+    return min(diff, 360 - diff)
+
+# Direction of travel for cars entering from each side
+_TRAVEL = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
+
+def _exit_lane(lane):
+    """Lane a car leaves through on the far side"""
+    if lane == 'right' or lane == 'straight_forward':
+        return 'straight_back2'
+    return 'straight_back'
+
+# Vehicles only collide if their headings differ by more than 45 degrees
+HEADING_CONFLICTS = np.array([
+    [_angle_difference(a, b) > 45 for b in range(len(HEADINGS))] for a in range(len(HEADINGS))
+])
+
+class RouteTable:
+    """Route geometry for every (origin, spawn lane) pair, computed once from the config.
+
+    Route ids are direction-major, route = direction index * spawn lanes + lane
+    index. Use config.route_table() to share one table per config.
+    """
+    def __init__(self, config):
+        self.keys = [(d, lane) for d in config.directions for lane in config.spawn_lane_types]
+        self.index = {key: i for i, key in enumerate(self.keys)}
+
+        n = len(self.keys)
+        self.starts = np.zeros((n, 2))
+        self.ends = np.zeros((n, 2))
+        self.headings = np.zeros(n, dtype=np.int8)
+        # Side of the intersection each route leaves through, as an index into config.directions
+        self.exit_sides = np.zeros(n, dtype=np.int8)
+        self.colors = []
+        # Names of the side each route leaves through and of its direction of travel
+        self.targets = []
+        self.travel = []
+        # Per-move displacement and the move on which a car reaches the end of the route
+        self.velocities = np.zeros((n, 2))
+        self.step_counts = np.zeros(n, dtype=np.int32)
+
+        speed = config.car_speed
+        for i, (origin, lane) in enumerate(self.keys):
+            target = config.turn_targets[(origin, lane)]
+            self.starts[i] = config.lane_positions[origin][lane]
+            self.ends[i] = config.lane_positions[target][_exit_lane(lane)]
+            self.headings[i] = HEADINGS.index(_TRAVEL[origin])
+            self.exit_sides[i] = config.directions.index(target)
+            self.colors.append(config.shade_colors[(origin, lane)])
+            self.targets.append(target)
+            self.travel.append(_TRAVEL[origin])
+
+            direction = self.ends[i] - self.starts[i]
+            self.velocities[i] = speed * direction / np.linalg.norm(direction)
+            # Same rule as VehicleStore.advance: a move that starts closer than speed arrives
+            position = self.starts[i].copy()
+            moves = 1
+            while np.linalg.norm(self.ends[i] - position) >= speed:
+                position += self.velocities[i]
+                moves += 1
+            self.step_counts[i] = moves
+
+    def __len__(self):
+        return len(self.keys)
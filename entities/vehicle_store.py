@@ -0,0 +1,138 @@
+from itertools import compress
+import numpy as np
+
+class VehicleStore:
+    """Structure-of-arrays storage for vehicles that have left their queues.
+
+    Rows [0, size) hold the in-flight vehicles. All of them are advanced with a
+    single vectorized step and finished rows are compacted away, keeping the
+    original release order. The matching Car objects are kept alongside so
+    callers that expect Car instances can still get them via car_views().
+
+    Vehicles can also be added in bulk by route id with add_batch(), tagged with
+    the index of the environment they belong to. A store should be filled
+    either with Car objects or in bulk, not both. With a CarPool, finished
+    Car objects are handed back to it for reuse.
+    """
+    _columns = ('positions', 'targets', 'route_ids', 'headings', 'env_ids', 'finished')
+
+    def __init__(self, config, capacity=64, pool=None):
+        self.config = config
+        self.routes = config.route_table()
+        self.pool = pool
+        self.size = 0
+        self.positions = np.zeros((capacity, 2))
+        self.targets = np.zeros((capacity, 2))
+        self.route_ids = np.zeros(capacity, dtype=np.int16)
+        self.headings = np.zeros(capacity, dtype=np.int8)
+        self.env_ids = np.zeros(capacity, dtype=np.int32)
+        self.finished = np.zeros(capacity, dtype=bool)
+        self.cars = []
+
+        # Environment and route of the vehicles that finished in the last advance()
+        self.exited_env_ids = np.zeros(0, dtype=np.int32)
+        self.exited_route_ids = np.zeros(0, dtype=np.int16)
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        capacity = len(self.positions)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in self._columns:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def clear(self):
+        self.size = 0
+        self.cars = []
+
+    def add(self, car):
+        """Append a car released from its queue"""
+        self._grow(self.size + 1)
+        i = self.size
+        route = car.route
+        self.positions[i] = car.position
+        self.targets[i] = self.routes.ends[route]
+        self.route_ids[i] = route
+        self.headings[i] = self.routes.headings[route]
+        self.env_ids[i] = 0
+        self.finished[i] = False
+        self.cars.append(car)
+        self.size += 1
+
+    def add_batch(self, route_ids, env_ids):
+        """Append vehicles starting at the beginning of the given routes"""
+        count = len(route_ids)
+        if count == 0:
+            return
+        self._grow(self.size + count)
+        rows = slice(self.size, self.size + count)
+        self.positions[rows] = self.routes.starts[route_ids]
+        self.targets[rows] = self.routes.ends[route_ids]
+        self.route_ids[rows] = route_ids
+        self.headings[rows] = self.routes.headings[route_ids]
+        self.env_ids[rows] = env_ids
+        self.finished[rows] = False
+        self.size += count
+
+    def advance(self, speed):
+        """Move every vehicle one step towards its target and drop finished ones.
+
+        Returns the number of vehicles that reached their target this step.
+        """
+        n = self.size
+        if n == 0:
+            return 0
+
+        positions = self.positions[:n]
+        targets = self.targets[:n]
+        direction = targets - positions
+        distance = np.linalg.norm(direction, axis=1)
+
+        arrived = distance < speed
+        moving = ~arrived
+        positions[moving] += speed * direction[moving] / distance[moving, None]
+        positions[arrived] = targets[arrived]
+        self.finished[:n] = arrived
+
+        exited = int(np.count_nonzero(arrived))
+        if exited:
+            self.exited_env_ids = self.env_ids[:n][arrived]
+            self.exited_route_ids = self.route_ids[:n][arrived]
+            self._compact()
+        else:
+            self.exited_env_ids = self.exited_env_ids[:0]
+            self.exited_route_ids = self.exited_route_ids[:0]
+        return exited
+
+    def _compact(self):
+        n = self.size
+        keep = ~self.finished[:n]
+        if self.cars:
+            finished = []
+            for i in np.flatnonzero(self.finished[:n]):
+                car = self.cars[i]
+                car.position[:] = self.positions[i]
+                car.finished = True
+                finished.append(car)
+            self.cars = list(compress(self.cars, keep))
+            if self.pool is not None:
+                self.pool.release(finished)
+
+        k = int(np.count_nonzero(keep))
+        for name in self._columns:
+            column = getattr(self, name)
+            column[:k] = column[:n][keep]
+        self.size = k
+
+    def car_views(self):
+        """Return the in-flight Car objects with positions synced from the arrays"""
+        for car, position in zip(self.cars, self.positions[:self.size]):
+            car.position[:] = position
+        return self.cars
@@ -0,0 +1,149 @@
+from collections import deque
+import numpy as np
+from entities.routes import HEADING_CONFLICTS
+from entities.vehicle_store import VehicleStore
+from simulation import TrafficSimulation
+
+class EventDrivenSimulation(TrafficSimulation):
+    """TrafficSimulation that schedules released cars instead of stepping them.
+
+    A released car drives a fixed straight line, so its whole trajectory
+    depends only on its route. Trajectories are traced once per route with the
+    same vehicle store arithmetic the tick engine uses; at release the car's
+    exit step and every step at which it will collide with a car already in
+    the intersection are looked up and scheduled. Per step the engine only
+    handles arrivals, the light controller and the events due at that step,
+    and cars_exited/collision_count match TrafficSimulation for the same
+    random draws.
+    """
+    def __init__(self, traffic_model, traffic_generator, config, seed=None):
+        super().__init__(traffic_model, traffic_generator, config, seed=seed)
+        self.routes = self.vehicles.routes
+        self._trajectories, self._step_counts = self._trace_routes()
+        self._max_steps = max(self._step_counts)
+        self._conflicts = self._build_conflict_table()
+
+        self._in_flight = deque()  # (release step, route id, car) in release order
+        self._exits_at = {}        # step -> cars finishing during that step
+        self._collisions_at = {}   # step -> collisions seen by that step's check
+
+    def _trace_routes(self):
+        """Positions after each move for every route, and the move on which it finishes"""
+        store = VehicleStore(self.config)
+        num_routes = len(self.routes)
+        store.add_batch(np.arange(num_routes), np.zeros(num_routes, dtype=np.int32))
+
+        trajectories = [[start.copy()] for start in self.routes.starts]
+        step_counts = [0] * num_routes
+        moves = 0
+        while store.size:
+            moves += 1
+            store.advance(self.config.car_speed)
+            for route in store.exited_route_ids:
+                step_counts[route] = moves
+            for route, position in zip(store.route_ids[:store.size], store.positions[:store.size]):
+                trajectories[route].append(position.copy())
+        return [np.array(t) for t in trajectories], step_counts
+
+    def _build_conflict_table(self):
+        """Map (earlier route, later route, release gap) to the later car's move counts at which they collide.
+
+        A car released at step t has made m moves when the collision check of
+        step t + m runs, and is still in the intersection for 1 <= m < its
+        step count.
+        """
+        conflicts = {}
+        threshold = self.config.collision_threshold
+        for route_a, trajectory_a in enumerate(self._trajectories):
+            steps_a = self._step_counts[route_a]
+            for route_b, trajectory_b in enumerate(self._trajectories):
+                if not HEADING_CONFLICTS[self.routes.headings[route_a], self.routes.headings[route_b]]:
+                    continue
+                steps_b = self._step_counts[route_b]
+                for gap in range(steps_a - 1):
+                    moves_b = np.arange(1, min(steps_b, steps_a - gap))
+                    if len(moves_b) == 0:
+                        continue
+                    distance = np.linalg.norm(trajectory_a[moves_b + gap] - trajectory_b[moves_b], axis=1)
+                    hits = moves_b[distance < threshold]
+                    if len(hits):
+                        conflicts[(route_a, route_b, gap)] = hits.tolist()
+        return conflicts
+
+    @property
+    def active_cars(self):
+        """In-flight cars with positions taken from their route trajectories"""
+        cars = []
+        for released, route, car in self._in_flight:
+            moves = self.time_step - released + 1
+            if moves < self._step_counts[route]:
+                car.position[:] = self._trajectories[route][moves]
+                cars.append(car)
+        return cars
+
+    @property
+    def active_car_count(self):
+        now = self.time_step + 1
+        step_counts = self._step_counts
+        return sum(1 for released, route, _ in self._in_flight if now - released < step_counts[route])
+
+    def vehicle_arrays(self):
+        positions, routes = [], []
+        for released, route, _ in self._in_flight:
+            moves = self.time_step - released + 1
+            if moves < self._step_counts[route]:
+                positions.append(self._trajectories[route][moves])
+                routes.append(route)
+        return np.array(positions).reshape(-1, 2), np.array(routes, dtype=np.int16)
+
+    def snapshot_arrays(self):
+        arrays = super().snapshot_arrays()
+        in_flight = [(released, route) for released, route, _ in self._in_flight]
+        arrays['events/in_flight'] = np.array(in_flight, dtype=np.int64).reshape(-1, 2)
+        arrays['events/exits_at'] = np.array(sorted(self._exits_at.items()), dtype=np.int64).reshape(-1, 2)
+        arrays['events/collisions_at'] = np.array(sorted(self._collisions_at.items()), dtype=np.int64).reshape(-1, 2)
+        return arrays
+
+    def restore_arrays(self, arrays):
+        self._in_flight = deque(
+            (int(released), int(route), self.car_pool.acquire(int(route)))
+            for released, route in arrays['events/in_flight']
+        )
+        self._exits_at = {int(step): int(count) for step, count in arrays['events/exits_at']}
+        self._collisions_at = {int(step): int(count) for step, count in arrays['events/collisions_at']}
+        super().restore_arrays(arrays)
+
+    def _release(self, d, lane):
+        car = self.queues[d][lane].pop(0)
+        i = self.config.directions.index(d)
+        j = self.config.spawn_lane_types.index(lane)
+        self.queue_counts[i, j] -= 1
+        self.departures[i, j] += 1
+
+        now = self.time_step
+        route = self.routes.index[(d, lane)]
+
+        # Cars released this long ago have finished before the next collision check
+        in_flight = self._in_flight
+        while in_flight and in_flight[0][0] + self._max_steps - 1 < now + 1:
+            self.car_pool.release((in_flight.popleft()[2],))
+
+        conflicts = self._conflicts
+        collisions_at = self._collisions_at
+        for released, other, _ in in_flight:
+            hits = conflicts.get((other, route, now - released))
+            if hits:
+                for moves in hits:
+                    collisions_at[now + moves] = collisions_at.get(now + moves, 0) + 1
+
+        in_flight.append((now, route, car))
+        exit_step = now + self._step_counts[route] - 1
+        self._exits_at[exit_step] = self._exits_at.get(exit_step, 0) + 1
+
+    def _advance_vehicles(self):
+        self.cars_exited += self._exits_at.pop(self.time_step, 0)
+
+    def _check_collisions(self):
+        collisions = self._collisions_at.pop(self.time_step, 0)
+        self.collision_count += collisions
+        return collisions > 0
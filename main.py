@@ -2,68 +2,198 @@ from entities.intersection import IntersectionConfig
 from models.fixed_cycle import FixedCycleModel
 from traffic.random_traffic import RandomTrafficGenerator
 from traffic.pattern_traffic import PatternedTrafficGenerator   
+from traffic.scenarios import ScenarioTapes
 from simulation import TrafficSimulation
+from vector_simulation import VectorTrafficSimulation
 from models.neural_network import NeuralNetworkModel
+from models.async_learner import AsyncLearner
+from models.policy_server import PolicyServer, ServedModel
 import itertools
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from collections import defaultdict
+from utils.model_store import ModelStore
+from utils.parallel import iter_parallel, run_parallel, seed_everything, task_seed
 
-def optimize_reward_parameters(config, traffic_generator, param_ranges, num_steps=1000, num_trials=3):
-    """
-    Optimize reward function parameters by testing different combinations.
-    Returns the best parameters found.
+def _run_reward_trial(config, traffic_generator, params, num_steps, seed):
+    """Train a fresh model with the given reward parameters and return (score, max_queue, std_queue)"""
+    seed_everything(seed)
+    model = NeuralNetworkModel(config)
+    model.reward_params = params
+
+    # Run simulation
+    sim = TrafficSimulation(model, traffic_generator, config)
+    sim.run_headless(num_steps)
+
+    # Calculate performance metrics
+    queue_lengths = []
+    for direction in config.directions:
+        for lane in config.spawn_lane_types:
+            queue_lengths.append(len(sim.queues[direction][lane]))
+
+    max_queue = max(queue_lengths)
+    std_queue = np.std(queue_lengths)
+    score = max_queue + std_queue
+    return score, max_queue, std_queue
+
+def _primes(count):
+    primes = []
+    candidate = 2
+    while len(primes) < count:
+        if all(candidate % p for p in primes):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+def _halton(count, dims, skip=1):
+    """Points skip .. skip+count-1 of the Halton sequence, as a (count, dims) array in [0, 1)"""
+    points = np.zeros((count, dims))
+    for d, base in enumerate(_primes(dims)):
+        for i in range(count):
+            n, fraction, value = i + skip, 1.0, 0.0
+            while n:
+                fraction /= base
+                value += fraction * (n % base)
+                n //= base
+            points[i, d] = value
+    return points
+
+def sample_reward_params(param_ranges, sampling='grid', num_candidates=None, seed=0):
+    """Candidate reward parameter dicts from param_ranges.
+
+    sampling='grid' takes every combination of the listed values (a random
+    subset of num_candidates of them if given). 'random' and 'halton' treat
+    each list as the continuous range between its smallest and largest value
+    and draw num_candidates points from it, uniformly at random or from the
+    Halton sequence, which covers the space more evenly than random points.
     """
     param_names = sorted(param_ranges.keys())
-    param_values = [param_ranges[name] for name in param_names]
-    param_combinations = list(itertools.product(*param_values))
-    
+    if sampling == 'grid':
+        param_values = [param_ranges[name] for name in param_names]
+        candidates = [dict(zip(param_names, combination)) for combination in itertools.product(*param_values)]
+        if num_candidates is not None and num_candidates < len(candidates):
+            chosen = np.random.default_rng(seed).choice(len(candidates), num_candidates, replace=False)
+            candidates = [candidates[i] for i in sorted(chosen)]
+        return candidates
+
+    if num_candidates is None:
+        raise ValueError(f"sampling={sampling!r} needs num_candidates")
+    if sampling == 'random':
+        points = np.random.default_rng(seed).random((num_candidates, len(param_names)))
+    elif sampling == 'halton':
+        points = _halton(num_candidates, len(param_names))
+    else:
+        raise ValueError(f"Unknown sampling {sampling!r}; expected 'grid', 'random' or 'halton'")
+    low = np.array([min(param_ranges[name]) for name in param_names], dtype=float)
+    high = np.array([max(param_ranges[name]) for name in param_names], dtype=float)
+    values = low + points * (high - low)
+    return [{name: round(float(value), 4) for name, value in zip(param_names, row)} for row in values]
+
+def _evaluate_candidates(config, traffic_generator, candidates, indices, num_steps, num_trials, workers, seed):
+    """Average (score, max_queue, std_queue) over num_trials runs of num_steps for each candidate in indices.
+
+    Trial seeds depend only on the candidate and trial number, so every run
+    length sees the same traffic and the scores are comparable across them.
+    """
+    tasks = [
+        (config, traffic_generator, candidates[i], num_steps, task_seed(seed, i, trial))
+        for i in indices
+        for trial in range(num_trials)
+    ]
+    trial_results = {i: [None] * num_trials for i in indices}
+    remaining = {i: num_trials for i in indices}
+    completed = 0
+
+    for index, result in iter_parallel(_run_reward_trial, tasks, workers):
+        position, trial = divmod(index, num_trials)
+        i = indices[position]
+        trial_results[i][trial] = result
+        remaining[i] -= 1
+        if remaining[i] == 0:
+            completed += 1
+            avg_score = np.mean([score for score, _, _ in trial_results[i]])
+            print(f"Finished combination {completed}/{len(indices)}: {candidates[i]} - Score: {avg_score:.2f}")
+    return trial_results
+
+def _best_params(candidates, trial_results):
     best_params = None
     best_score = float('inf')
-    
-    print(f"\nStarting reward parameter optimization with {len(param_combinations)} combinations...")
-    
-    for i, combination in enumerate(param_combinations):
-        params = dict(zip(param_names, combination))
-        print(f"\nTesting combination {i+1}/{len(param_combinations)}: {params}")
-        
-        trial_scores = []
-        
-        for trial in range(num_trials):
-            model = NeuralNetworkModel(config)
-            model.reward_params = params
-            
-            # Run simulation
-            sim = TrafficSimulation(model, traffic_generator, config)
-            sim.run_headless(num_steps)
-            
-            # Calculate performance metrics
-            queue_lengths = []
-            for direction in config.directions:
-                for lane in config.spawn_lane_types:
-                    queue_lengths.append(len(sim.queues[direction][lane]))
-            
-            max_queue = max(queue_lengths)
-            std_queue = np.std(queue_lengths)
-            score = max_queue + std_queue 
-            
-            trial_scores.append(score)
-        
-        avg_score = np.mean(trial_scores)
+
+    for i, results in trial_results.items():
+        avg_score = np.mean([score for score, _, _ in results])
         
         if avg_score < best_score:
+            _, max_queue, std_queue = results[-1]
             best_score = avg_score
-            best_params = params.copy()
+            best_params = candidates[i].copy()
             best_params['score'] = best_score
             best_params['max_queue'] = max_queue
             best_params['std_queue'] = std_queue
-            print(f"New best parameters found! Score: {best_score:.2f}")
+    return best_params
+
+def optimize_reward_parameters(config, traffic_generator, param_ranges, num_steps=1000, num_trials=3, workers=None, seed=0,
+                               search='exhaustive', sampling='grid', num_candidates=None, eta=3, min_steps=None):
+    """
+    Optimize reward function parameters by testing different combinations.
+    Returns the best parameters found.
+
+    Trials are spread over `workers` processes (one per core by default). Each
+    trial is seeded from `seed` and its candidate's index, so the result is
+    the same for any number of workers.
+
+    search='exhaustive' runs every candidate for num_steps. search='halving'
+    (successive halving) first runs all candidates for min_steps (by default
+    num_steps / eta**3, at least 10), keeps the best 1/eta of them, runs those
+    eta times longer, and so on until the survivors get the full num_steps.
+    Each round restarts the runs with the same seeds rather than continuing
+    them. Candidates come from sample_reward_params(param_ranges, sampling,
+    num_candidates).
+    """
+    candidates = sample_reward_params(param_ranges, sampling, num_candidates, seed)
+    survivors = list(range(len(candidates)))
+
+    budgets = [num_steps]
+    if search == 'halving':
+        if eta < 2:
+            raise ValueError(f"eta must be at least 2, got {eta}")
+        if min_steps is None:
+            min_steps = max(10, num_steps // eta ** 3)
+        while budgets[0] // eta >= min_steps and eta ** len(budgets) < len(candidates):
+            budgets.insert(0, budgets[0] // eta)
+    elif search != 'exhaustive':
+        raise ValueError(f"Unknown search {search!r}; expected 'exhaustive' or 'halving'")
+
+    print(f"\nStarting reward parameter optimization with {len(candidates)} combinations...")
+
+    simulated = 0
+    for rung, steps in enumerate(budgets):
+        if len(budgets) > 1:
+            print(f"Round {rung + 1}/{len(budgets)}: {len(survivors)} combinations, {steps} steps")
+        trial_results = _evaluate_candidates(config, traffic_generator, candidates, survivors, steps, num_trials, workers, seed)
+        simulated += len(survivors) * num_trials * steps
+        if rung < len(budgets) - 1:
+            ranked = sorted(survivors, key=lambda i: np.mean([score for score, _, _ in trial_results[i]]))
+            survivors = sorted(ranked[:max(1, len(ranked) // eta)])
+
+    best_params = _best_params(candidates, trial_results)
     
     print("\nOptimization complete!")
+    if search == 'halving':
+        exhaustive = len(candidates) * num_trials * num_steps
+        print(f"Simulated {simulated} steps ({simulated / exhaustive:.0%} of an exhaustive search)")
     print(f"Best parameters: {best_params}")
     return best_params
 
-def train_headless(config, reward_params=None, episodes=10, steps_per_episode=1000):
-    """Train the neural network without visualization"""
+def train_headless(config, reward_params=None, episodes=10, steps_per_episode=1000, async_learning=False, updates_per_step=1.0, store=None):
+    """Train the neural network without visualization.
+
+    With async_learning=True the network trains on a background AsyncLearner
+    thread, at up to updates_per_step gradient steps per simulation step,
+    while the simulation acts with a periodically synced copy.
+    With a ModelStore, training resumes from the stored model for the same
+    reward parameters and setup, skips the episodes already done, and saves
+    after every episode.
+    """
     model = NeuralNetworkModel(config)
     
     # Apply reward parameters if provided
@@ -72,12 +202,41 @@ def train_headless(config, reward_params=None, episodes=10, steps_per_episode=10
     
     #traffic = RandomTrafficGenerator(config)
     traffic = PatternedTrafficGenerator(config)
+
+    completed = 0
+    if store is not None:
+        training = {
+            'traffic': type(traffic).__name__,
+            'steps_per_episode': steps_per_episode,
+            'replay_capacity': model.memory.capacity,
+            'batch_size': model.batch_size,
+            'gamma': model.gamma,
+        }
+        key = store.key(model.reward_params, training)
+        meta = store.load(key, model)
+        if meta is not None:
+            completed = meta['episodes']
+            print(f"Loaded model {key} trained for {completed} episodes")
+
     sim = TrafficSimulation(model, traffic, config)
-    
+    learner = AsyncLearner(model, updates_per_step=updates_per_step) if async_learning and completed < episodes else None
+    if learner:
+        learner.start()
+
     print("Starting headless training...")
-    for episode in range(episodes):
-        sim.run_headless(steps=steps_per_episode)
-        print(f"Episode {episode + 1}/{episodes} completed")
+    try:
+        for episode in range(completed, episodes):
+            sim.run_headless(steps=steps_per_episode)
+            print(f"Episode {episode + 1}/{episodes} completed")
+            if store is not None:
+                if learner:
+                    learner.stop()
+                store.save(key, model, model.reward_params, training, episodes=episode + 1)
+                if learner:
+                    learner.start()
+    finally:
+        if learner:
+            learner.stop()
         
     print("Training completed!")
     return model
@@ -88,46 +247,127 @@ def run_with_visualization(config, trained_model):
     sim = TrafficSimulation(trained_model, traffic, config)
     sim.run()
 
-def evaluate_model_on_single_run(config, model, traffic_generator, num_steps=100):
+def evaluate_model_on_single_run(config, model, traffic_generator, num_steps=100, seed=None):
     """
     Runs a simulation headlessly and returns:
     - Number of cars exited (throughput)
     - Number of collisions
     """
+    if seed is not None:
+        seed_everything(seed)
     sim = TrafficSimulation(model, traffic_generator, config)
     sim.run_headless(steps=num_steps)
     return sim.cars_exited, sim.collision_count
 
-def evaluate_model(config, model, traffic_generator, num_steps=100, num_runs=50, crash_penalty=4):
+def _run_served(config, server, traffic_generator, num_steps, seed):
+    """One evaluation run whose actions come from a shared PolicyServer"""
+    sim = TrafficSimulation(ServedModel(config, server), traffic_generator, config, seed=seed)
+    sim.run_headless(steps=num_steps)
+    return sim.cars_exited, sim.collision_count
+
+def _evaluation_runs(config, model, traffic_generator, num_steps, num_runs, vectorized, workers, served, seed, scenarios):
+    """(exited, collisions) for each evaluation run; see evaluate_model"""
+    if scenarios is not None and num_runs > len(scenarios):
+        raise ValueError(f"num_runs={num_runs} needs at least that many scenarios, the tapes have {len(scenarios)}")
+    if scenarios is not None and num_steps > scenarios.num_steps:
+        # Past the end of the tapes nothing arrives, which would silently skew the results
+        raise ValueError(f"num_steps={num_steps} is longer than the {scenarios.num_steps} recorded steps of the tapes")
+    if scenarios is not None:
+        generators = [scenarios.scenario(run) for run in range(num_runs)]
+    else:
+        generators = [traffic_generator] * num_runs
+
+    if vectorized:
+        batch = scenarios.batch(num_runs) if scenarios is not None else traffic_generator
+        vsim = VectorTrafficSimulation(model, batch, config, num_runs)
+        vsim.run_headless(steps=num_steps)
+        return list(zip(vsim.cars_exited.tolist(), vsim.collision_count.tolist()))
+    elif served:
+        if getattr(model, 'model', None) is None:
+            raise ValueError(f"served=True needs a model with a torch network (model.model), not {type(model).__name__}")
+        with PolicyServer(model.model, max_batch=num_runs) as server, ThreadPoolExecutor(num_runs) as executor:
+            futures = [
+                executor.submit(_run_served, config, server, generators[run], num_steps, task_seed(seed, run))
+                for run in range(num_runs)
+            ]
+            return [future.result() for future in futures]
+    elif workers is not None:
+        tasks = [(config, model, generators[run], num_steps, task_seed(seed, run)) for run in range(num_runs)]
+        return run_parallel(evaluate_model_on_single_run, tasks, workers)
+    else:
+        return [evaluate_model_on_single_run(config, model, generators[run], num_steps) for run in range(num_runs)]
+
+def _adjusted_throughput(exited, collisions, num_steps, crash_penalty):
+    cars_per_step = exited / num_steps
+    return exited - (collisions * cars_per_step * crash_penalty)
+
+def evaluate_model(config, model, traffic_generator, num_steps=100, num_runs=50, crash_penalty=4, vectorized=False, workers=None, served=False, seed=0, scenarios=None):
     """
     Runs the simulation multiple times and returns average:
     - Number of cars exited (throughput)
     - Number of collisions
     - Adjusted throughput based on collisions
+
+    With vectorized=True all runs are stepped together in one
+    VectorTrafficSimulation; the model is only evaluated, not trained.
+    With workers set, runs are spread over that many processes, each starting
+    from a copy of the model and seeded from `seed` and the run index.
+    With served=True all runs step on their own threads and get greedy actions
+    from one PolicyServer, which batches their queries into shared forward
+    passes; traffic is seeded from `seed` and the run index. Served mode only
+    works for models with a torch network (NeuralNetworkModel) and measures
+    its greedy policy, without exploration or training, unlike the other modes.
+    With scenarios (a traffic.ScenarioTapes), run i replays scenario i instead
+    of drawing traffic from traffic_generator.
     """
+    results = _evaluation_runs(config, model, traffic_generator, num_steps, num_runs, vectorized, workers, served, seed, scenarios)
+    return _average_results(results, num_steps, crash_penalty)
+
+def _average_results(results, num_steps, crash_penalty):
+    """Average throughput, collisions and adjusted throughput over (exited, collisions) runs"""
     total_exited = 0
     total_collisions = 0
     adjusted_exited = 0
 
-    for run in range(num_runs):
-        sim = TrafficSimulation(model, traffic_generator, config)
-        sim.run_headless(steps=num_steps)
-
-        exited = sim.cars_exited
-        collisions = sim.collision_count
-
+    for exited, collisions in results:
         total_exited += exited
         total_collisions += collisions
+        adjusted_exited += _adjusted_throughput(exited, collisions, num_steps, crash_penalty)
 
-        cars_per_step = exited / num_steps
-        adjusted_exited += exited - (collisions * cars_per_step * crash_penalty)
-
+    num_runs = len(results)
     avg_exited = total_exited / num_runs
     avg_collisions = total_collisions / num_runs
     avg_adjusted_exited = adjusted_exited / num_runs
 
     return avg_exited, avg_collisions, avg_adjusted_exited
 
+def compare_models(config, model, baseline, scenarios, num_steps=100, num_runs=None, crash_penalty=4, vectorized=False, workers=None):
+    """
+    Runs model and baseline on the same scenario tapes (all of them by
+    default) and returns:
+    - evaluate_model's averages for the model
+    - evaluate_model's averages for the baseline
+    - Mean paired difference in adjusted throughput (model minus baseline)
+    - Standard error of that difference
+
+    Both models see identical demand in run i, so the traffic's own variation
+    cancels out of the differences and far fewer runs are needed than when
+    comparing two separately sampled averages.
+    """
+    if num_runs is None:
+        num_runs = len(scenarios)
+    averages = []
+    adjusted = []
+    for m in (model, baseline):
+        results = _evaluation_runs(config, m, None, num_steps, num_runs, vectorized, workers, False, 0, scenarios)
+        averages.append(_average_results(results, num_steps, crash_penalty))
+        adjusted.append(np.array([_adjusted_throughput(exited, collisions, num_steps, crash_penalty)
+                                  for exited, collisions in results]))
+
+    differences = adjusted[0] - adjusted[1]
+    stderr = differences.std(ddof=1) / np.sqrt(num_runs) if num_runs > 1 else float('nan')
+    return averages[0], averages[1], differences.mean(), stderr
+
 
 def main():
     config = IntersectionConfig()
@@ -144,13 +384,17 @@ def main():
         'imbalance_penalty_weight': [-0.25, -0.2, -0.15]
     }
     
-    # Optimize reward parameters - uncomment this if you want to test all of the parameter combinations from param_ranges above
+    # Optimize reward parameters - uncomment this if you want to search the parameter space from param_ranges above
     #best_params = optimize_reward_parameters(
     #    config, 
     #    traffic,
     #    param_ranges,
     #    num_steps=100,  # Shorter for optimization
-    #    num_trials=2    # Fewer trials for speed
+    #    num_trials=2,   # Fewer trials for speed
+    #    workers=None,   # One process per core
+    #    search='halving',     # Drop poor combinations early; 'exhaustive' runs the whole grid
+    #    sampling='halton',    # Sample the ranges instead of the 729-point grid
+    #    num_candidates=81
     #)
 
     best_params = {
@@ -169,18 +413,23 @@ def main():
         config,
         reward_params=best_params,
         episodes=10,
-        steps_per_episode=100
+        steps_per_episode=100,
+        store=ModelStore('trained_models')
     )
     
-    # Test throughput
+    # Test throughput - both models replay the same recorded demand
     print("======= Evaluating Models ======")
-    trained_exited, trained_collisions, trained_adjusted = evaluate_model(config, trained_model, traffic, num_steps=100)
+    scenarios = ScenarioTapes.load_or_record(traffic, 'scenarios/patterned.npy', num_scenarios=50, num_steps=100)
+    fixed_model = FixedCycleModel(config)
+    trained_stats, fixed_stats, difference, stderr = compare_models(config, trained_model, fixed_model, scenarios, num_steps=100, vectorized=True)
+    trained_exited, trained_collisions, trained_adjusted = trained_stats
     print(f"Trained Model - Throughput: {trained_exited} cars, Collisions: {trained_collisions}, Adjusted Throughput: {trained_adjusted}")
 
-    fixed_model = FixedCycleModel(config)
-    fixed_exited, fixed_collisions, fixed_adjusted = evaluate_model(config, fixed_model, traffic, num_steps=100)
+    fixed_exited, fixed_collisions, fixed_adjusted = fixed_stats
     print(f"Fixed-Cycle Model - Throughput: {fixed_exited} cars, Collisions: {fixed_collisions}, Adjusted Throughput: {fixed_adjusted}")
 
+    print(f"Trained - Fixed-Cycle Adjusted Throughput: {difference:.2f} +/- {1.96 * stderr:.2f} (95% CI, paired over {len(scenarios)} scenarios)")
+
 
     # Step 3: Run visualization with trained model
     #run_with_visualization(config, trained_model)
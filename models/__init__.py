@@ -1,9 +1,10 @@
 """Traffic light control models package."""
 
-from .base_model import BaseTrafficLightModel
+from .base_model import BaseTrafficLightModel, LIGHT_STATES
 from .fixed_cycle import FixedCycleModel
+from .frozen_policy import FrozenPolicyModel
 
 # Future models would be imported here
 # from .neural_net import NeuralNetworkModel
 
-__all__ = ['BaseTrafficLightModel', 'FixedCycleModel']
\ No newline at end of file
+__all__ = ['BaseTrafficLightModel', 'LIGHT_STATES', 'FixedCycleModel', 'FrozenPolicyModel']
\ No newline at end of file
@@ -0,0 +1,87 @@
+import copy
+import threading
+
+class AsyncLearner:
+    """Train a NeuralNetworkModel on a background thread while the simulation acts.
+
+    While running, the model picks actions with a copy of its network that is
+    refreshed from the trained one every sync_every updates, and replay() only
+    tells the learner that another step was taken. The learner thread samples
+    the replay buffer and trains at its own pace, up to updates_per_step
+    updates per simulation step (it waits when it gets ahead, and catches up
+    when the simulation pauses). PyTorch releases the GIL inside its kernels,
+    so the forward/backward passes overlap with the simulation step.
+
+        with AsyncLearner(model, updates_per_step=0.5):
+            sim.run_headless(steps=10000)
+
+    Training is not step-for-step reproducible in this mode, since it depends
+    on thread timing. Stop the learner before snapshotting the model.
+    """
+    def __init__(self, model, updates_per_step=1.0, sync_every=50):
+        self.model = model
+        self.updates_per_step = updates_per_step
+        self.sync_every = sync_every
+        self.steps = 0
+        self.updates = 0
+        self.error = None
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._stopping = False
+        self._sync()
+        self.model.learner = self
+        self._thread = threading.Thread(target=self._run, name='learner', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the learner thread and act with the trained network again (no-op if not running)"""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        self.model.learner = None
+        self.model.actor = self.model.model
+        if self.error is not None:
+            raise RuntimeError("Learner thread failed") from self.error
+
+    def step(self):
+        """Called by the model once per simulation step; never blocks on training"""
+        with self._condition:
+            self.steps += 1
+            self._condition.notify()
+
+    def _sync(self):
+        # Swap in a fresh copy rather than loading weights into the one the actor may be using
+        self.model.actor = copy.deepcopy(self.model.model)
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    while not self._stopping and self.updates >= int(self.steps * self.updates_per_step):
+                        self._condition.wait()
+                    if self._stopping:
+                        return
+                if self.model.train_batch():
+                    self.updates += 1
+                    if self.updates % self.sync_every == 0:
+                        self._sync()
+                else:
+                    # Not enough experience yet; count the step as used
+                    with self._condition:
+                        self.updates += 1
+        except Exception as error:
+            self.error = error
@@ -1,3 +1,8 @@
+import numpy as np
+
+# Light states in action index order
+LIGHT_STATES = [('NS', 'left'), ('NS', 'straight'), ('EW', 'left'), ('EW', 'straight')]
+
 class BaseTrafficLightModel:
     def __init__(self, config):
         self.config = config
@@ -5,6 +10,20 @@ class BaseTrafficLightModel:
     def get_light_state(self, time_step, queues):
         """To be implemented by child classes"""
         raise NotImplementedError
+
+    def get_light_states(self, time_step, queue_counts):
+        """Batched version of get_light_state for stacked (K, directions, lanes) queue counts.
+
+        Returns an array of K action indices into LIGHT_STATES.
+        """
+        raise NotImplementedError
+
+    def queue_state(self, queues):
+        """Queue lengths as a float32 state vector, direction-major, from a queues dict or queue counts"""
+        if isinstance(queues, dict):
+            return np.array([len(queues[d][lane]) for d in self.config.directions for lane in self.config.spawn_lane_types],
+                            dtype=np.float32)
+        return np.asarray(queues, dtype=np.float32).reshape(-1)
         
     def update(self, time_step, queues):
         """Optional method for models that need to learn/update"""
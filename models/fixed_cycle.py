@@ -1,4 +1,5 @@
-from .base_model import BaseTrafficLightModel
+import numpy as np
+from .base_model import BaseTrafficLightModel, LIGHT_STATES
 
 class FixedCycleModel(BaseTrafficLightModel):
     def __init__(self, config):
@@ -17,4 +18,8 @@ class FixedCycleModel(BaseTrafficLightModel):
         elif t < 2 * self.left_arrow_duration + self.green_cycle_duration:
             return ('EW', 'left')
         else:
-            return ('EW', 'straight')
\ No newline at end of file
+            return ('EW', 'straight')
+
+    def get_light_states(self, time_step, queue_counts):
+        action = LIGHT_STATES.index(self.get_light_state(time_step, None))
+        return np.full(len(queue_counts), action)
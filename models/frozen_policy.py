@@ -0,0 +1,85 @@
+import numpy as np
+from .base_model import BaseTrafficLightModel, LIGHT_STATES
+
+# Bump when the layout of saved policies changes
+POLICY_VERSION = 1
+
+class FrozenPolicyModel(BaseTrafficLightModel):
+    """Greedy policy of a trained NeuralNetworkModel, evaluated with NumPy only.
+
+    The network is stored as a list of (weight, bias) float32 arrays for its
+    Linear layers, with a ReLU between consecutive layers, which is how
+    NeuralNetworkModel builds it. Nothing here imports torch: build one with
+    from_model() where torch is available, save() it, and load() it anywhere.
+    """
+    def __init__(self, config, weights, biases):
+        super().__init__(config)
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+
+    @classmethod
+    def from_model(cls, model):
+        """Copy the current weights of a NeuralNetworkModel"""
+        weights, biases = [], []
+        expect_linear = True
+        for layer in model.model:
+            name = type(layer).__name__
+            if expect_linear and name == 'Linear':
+                # torch stores (out, in); keep (in, out) so a batch of states multiplies from the left
+                weights.append(layer.weight.detach().cpu().numpy().T)
+                biases.append(layer.bias.detach().cpu().numpy())
+            elif expect_linear or name != 'ReLU':
+                raise ValueError(f"Cannot freeze a network with a {name} layer here; expected Linear/ReLU layers")
+            expect_linear = not expect_linear
+        return cls(model.config, weights, biases)
+
+    def save(self, path):
+        arrays = {'format_version': np.array(POLICY_VERSION)}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'weights/{i}'] = w
+            arrays[f'biases/{i}'] = b
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, config, path):
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data['format_version'])
+            if version > POLICY_VERSION:
+                raise ValueError(f"Unsupported policy format version {version} in {path}")
+            count = sum(1 for key in data.files if key.startswith('weights/'))
+            weights = [data[f'weights/{i}'] for i in range(count)]
+            biases = [data[f'biases/{i}'] for i in range(count)]
+        return cls(config, weights, biases)
+
+    def q_values(self, states):
+        """Action values for a (K, state size) batch of states"""
+        x = np.asarray(states, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            x = x @ w + b
+            if i < last:
+                np.maximum(x, 0, out=x)
+        return x
+
+    def get_light_state(self, time_step, queues):
+        return LIGHT_STATES[int(np.argmax(self.q_values(self.queue_state(queues)[None])[0]))]
+
+    def get_light_states(self, time_step, queue_counts):
+        return np.argmax(self.q_values(queue_counts.reshape(len(queue_counts), -1)), axis=1)
+
+    def verify(self, model, states=None, num_states=10000, max_queue=30, seed=0):
+        """Return the states on which this policy and model's torch network pick different actions.
+
+        By default checks num_states random queue-count vectors with up to
+        max_queue cars per lane.
+        """
+        import torch
+
+        if states is None:
+            rng = np.random.default_rng(seed)
+            states = rng.integers(0, max_queue + 1, size=(num_states, len(self.weights[0]))).astype(np.float32)
+        states = np.asarray(states, dtype=np.float32)
+        with torch.no_grad():
+            expected = torch.argmax(model.model(torch.from_numpy(states).to(model.device)), dim=1).cpu().numpy()
+        actual = np.argmax(self.q_values(states), axis=1)
+        return states[actual != expected]
@@ -2,13 +2,15 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from collections import deque
 import random
 import itertools
 from collections import defaultdict
+from .base_model import LIGHT_STATES
+from .replay_buffer import ReplayBuffer
+from .wait_times import WaitTimeTracker
 
 class NeuralNetworkModel:
-    def __init__(self, config):
+    def __init__(self, config, replay_capacity=2000):
         self.config = config
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
@@ -26,10 +28,13 @@ class NeuralNetworkModel:
         self.action_size = 4  # NS-left, NS-straight, EW-left, EW-straight
         self.model = self._build_model()
         self.optimizer = optim.Adam(self.model.parameters(), lr=0.001)
+        # Network used to pick actions; a synced copy while an AsyncLearner trains self.model
+        self.actor = self.model
+        self.learner = None
         
         # Tracking and memory
-        self.wait_times = {}     
-        self.memory = deque(maxlen=2000)
+        self.wait_times = WaitTimeTracker((len(config.directions), len(config.spawn_lane_types)))
+        self.memory = ReplayBuffer(replay_capacity, self.state_size, device=self.device)
         self.batch_size = 32
         self.gamma = 0.95
 
@@ -58,15 +63,16 @@ class NeuralNetworkModel:
         ).to(self.device)
         return model
     
-    def get_light_state(self, time_step, queues):
-        state = self.get_state(queues)
+    def get_light_state(self, time_step, queues, state=None):
+        if state is None:
+            state = self.get_state(queues)
         
         # Epsilon-greedy action selection
         if random.random() < self.epsilon:
             action = random.randint(0, self.action_size - 1)
         else:
             with torch.no_grad():
-                action_values = self.model(state)
+                action_values = self.actor(state)
             action = torch.argmax(action_values).item()
         
         # Update exploration rate
@@ -82,6 +88,20 @@ class NeuralNetworkModel:
         else:
             return ('EW', 'straight')
     
+    def get_light_states(self, time_step, queue_counts):
+        """Epsilon-greedy actions for stacked (K, directions, lanes) queue counts in one forward pass"""
+        num_envs = len(queue_counts)
+        states = torch.as_tensor(queue_counts.reshape(num_envs, -1), dtype=torch.float32).to(self.device)
+        with torch.no_grad():
+            actions = torch.argmax(self.actor(states), dim=1).cpu().numpy()
+
+        explore = np.random.random(num_envs) < self.epsilon
+        actions[explore] = np.random.randint(0, self.action_size, int(explore.sum()))
+
+        # One decay per batched step, as every environment advances by the same step
+        self._decay_epsilon()
+        return actions
+
     def _decay_epsilon(self):
         """Decay epsilon over time"""
         self.steps_done += 1
@@ -93,44 +113,29 @@ class NeuralNetworkModel:
         self.epsilon = value
         self.steps_done = 0
     
+    def _queue_counts(self, queues):
+        """Queue lengths as a (directions, lanes) array, from a queue dict or an existing count array"""
+        if isinstance(queues, dict):
+            return np.array([[len(queues[direction][lane]) for lane in self.config.spawn_lane_types]
+                             for direction in self.config.directions])
+        return queues
+
     def get_state(self, queues):
-        """Convert queue lengths to state vector"""
-        state = []
-        for direction in self.config.directions:
-            for lane in self.config.spawn_lane_types:
-                state.append(len(queues[direction][lane]))
-        return torch.FloatTensor(state).to(self.device)
+        """Convert queue lengths (a queue dict or a count array) to state vector"""
+        counts = self._queue_counts(queues)
+        return torch.tensor(counts.reshape(-1), dtype=torch.float32, device=self.device)
     
-    def update_wait_times(self, queues, light_state, current_time):
-        """Update wait times for all queued cars"""
-        try:
-            light_dir, _ = light_state
-            
-            for direction in self.config.directions:
-                has_red_light = ((light_dir == 'NS' and direction in ['E', 'W']) or 
-                            (light_dir == 'EW' and direction in ['N', 'S']))
-                
-                for lane in self.config.spawn_lane_types:
-                    for car in queues[direction][lane]:
-                        car_id = id(car)
-                        
-                        if car_id not in self.wait_times:
-                            self.wait_times[car_id] = {
-                                'first_seen': current_time,
-                                'last_moved': current_time,
-                                'total_wait': 0  
-                            }
-                        
-                        if has_red_light:
-                            if self.wait_times[car_id]['last_moved'] == current_time - 1:
-                                self.wait_times[car_id]['total_wait'] += 1
-                        else:
-                            self.wait_times[car_id]['last_moved'] = current_time
-    
-        except Exception as e:
-            print(f"Error in update_wait_times: {e}")
+    def update_wait_times(self, arrivals, departures, current_time):
+        """Record this step's per-lane arrivals and departures in the wait-time tracker"""
+        self.wait_times.update(current_time, arrivals, departures)
+
+    def calculate_reward(self, queues, light_state, collision_detected=False, previous_queues=None, departures=None):
+        """Reward for the step just taken.
 
-    def calculate_reward(self, queues, light_state, collision_detected=False, previous_queues=None):
+        queues may be a queue dict or a (directions, lanes) count array. Throughput
+        is taken from the per-lane departures array when given, otherwise it is
+        re-derived from previous_queues.
+        """
         try:
             # Track light duration
             if light_state == self.last_light_state:
@@ -143,10 +148,7 @@ class NeuralNetworkModel:
             collision_penalty = self.reward_params['collision_penalty_weight'] if collision_detected else 0
             
             # 2. Queue-based rewards
-            direction_counts = {d: 0 for d in self.config.directions}
-            for direction in self.config.directions:
-                for lane in self.config.spawn_lane_types:
-                    direction_counts[direction] += len(queues[direction][lane])
+            direction_counts = dict(zip(self.config.directions, self._queue_counts(queues).sum(axis=1).tolist()))
             
             # 3. Active direction metrics
             active_dir = light_state[0]
@@ -155,7 +157,11 @@ class NeuralNetworkModel:
             
             # 4. Throughput calculation
             throughput_bonus = 0
-            if previous_queues is not None:
+            if departures is not None:
+                allowed = [self.config.directions.index(d) for d in (['N', 'S'] if active_dir == 'NS' else ['E', 'W'])]
+                exited = int(departures[allowed].sum())
+                throughput_bonus = exited * self.reward_params['throughput_bonus_weight']
+            elif previous_queues is not None:
                 exited = self.count_queue_exit(previous_queues, queues, light_state)
                 throughput_bonus = exited * self.reward_params['throughput_bonus_weight']
             
@@ -187,18 +193,21 @@ class NeuralNetworkModel:
             return 0, 0
 
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.add(state, action, reward, next_state, done)
     
     def replay(self):
+        """Train on one batch, or just report the step to the AsyncLearner if one is running"""
+        if self.learner is not None:
+            self.learner.step()
+        else:
+            self.train_batch()
+
+    def train_batch(self):
+        """One gradient step on a sampled batch; False if there is not enough experience yet"""
         if len(self.memory) < self.batch_size:
-            return
+            return False
 
-        minibatch = random.sample(self.memory, self.batch_size)
-        states = torch.stack([x[0] for x in minibatch]).to(self.device)
-        actions = torch.tensor([x[1] for x in minibatch], dtype=torch.long).to(self.device)
-        rewards = torch.tensor([x[2] for x in minibatch], dtype=torch.float32).to(self.device).squeeze()
-        next_states = torch.stack([x[3] for x in minibatch]).to(self.device)
-        dones = torch.tensor([x[4] for x in minibatch], dtype=torch.float32).to(self.device).squeeze()
+        states, actions, rewards, next_states, dones = self.memory.sample(self.batch_size)
 
         current_q = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
         with torch.no_grad():
@@ -210,30 +219,73 @@ class NeuralNetworkModel:
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
+        return True
             
-    def cleanup_wait_times(self, active_cars, queues):
-        """Remove entries for cars that have exited the simulation"""
-        try:
-            active_ids = {id(car) for car in active_cars}
-            # Also keep cars that are still in queues
-            for direction in self.config.directions:
-                for lane in self.config.spawn_lane_types:
-                    active_ids.update(id(car) for car in queues[direction][lane])
-            
-            # Create new dictionary with only active cars
-            cleaned_wait_times = {}
-            for car_id, wait_data in self.wait_times.items():
-                if car_id in active_ids:
-                    cleaned_wait_times[car_id] = {
-                        'first_seen': wait_data.get('first_seen', 0),
-                        'last_moved': wait_data.get('last_moved', 0),
-                        'total_wait': wait_data.get('total_wait', 0)
-                    }
-            
-            self.wait_times = cleaned_wait_times
-        
-        except Exception as e:
-            print(f"Error in cleanup_wait_times: {e}")
+    def snapshot_arrays(self):
+        """Learner state as a flat dict of NumPy arrays"""
+        arrays = {}
+        for name, tensor in self.model.state_dict().items():
+            arrays['weights/' + name] = tensor.detach().cpu().numpy()
+
+        for index, param in enumerate(self.model.parameters()):
+            state = self.optimizer.state.get(param)
+            if state:
+                arrays[f'adam/{index}/step'] = np.array(float(state['step']))
+                arrays[f'adam/{index}/exp_avg'] = state['exp_avg'].detach().cpu().numpy()
+                arrays[f'adam/{index}/exp_avg_sq'] = state['exp_avg_sq'].detach().cpu().numpy()
+        arrays['adam/lr'] = np.array(self.optimizer.param_groups[0]['lr'])
+
+        for key, value in self.memory.to_arrays().items():
+            arrays['memory/' + key] = value
+
+        for key, value in self.wait_times.to_arrays().items():
+            arrays['wait_times/' + key] = value
+
+        arrays['reward_params/names'] = np.array(sorted(self.reward_params))
+        arrays['reward_params/values'] = np.array([float(self.reward_params[k]) for k in sorted(self.reward_params)])
+        last_action = LIGHT_STATES.index(self.last_light_state) if self.last_light_state is not None else -1
+        arrays['counters'] = np.array([self.epsilon, self.steps_done, self.current_green_duration, last_action], dtype=np.float64)
+        arrays['episode_rewards'] = np.array(self.episode_rewards, dtype=np.float64)
+        arrays['episode_wait_times'] = np.array(self.episode_wait_times, dtype=np.float64)
+        return arrays
+
+    def restore_arrays(self, arrays):
+        """Restore state written by snapshot_arrays"""
+        self.model.load_state_dict({
+            key[len('weights/'):]: torch.from_numpy(value.copy())
+            for key, value in arrays.items() if key.startswith('weights/')
+        })
+
+        optimizer_state = self.optimizer.state_dict()
+        optimizer_state['state'] = {}
+        for index, _ in enumerate(self.model.parameters()):
+            if f'adam/{index}/step' in arrays:
+                optimizer_state['state'][index] = {
+                    'step': torch.tensor(float(arrays[f'adam/{index}/step'])),
+                    'exp_avg': torch.from_numpy(arrays[f'adam/{index}/exp_avg'].copy()),
+                    'exp_avg_sq': torch.from_numpy(arrays[f'adam/{index}/exp_avg_sq'].copy()),
+                }
+        optimizer_state['param_groups'][0]['lr'] = float(arrays['adam/lr'])
+        self.optimizer.load_state_dict(optimizer_state)
+
+        self.memory.load_arrays({
+            key[len('memory/'):]: value for key, value in arrays.items() if key.startswith('memory/')
+        })
+
+        self.wait_times.reset()
+        if 'wait_times/counts' in arrays:
+            self.wait_times.load_arrays({
+                key[len('wait_times/'):]: value for key, value in arrays.items() if key.startswith('wait_times/')
+            })
+
+        self.reward_params = dict(zip(arrays['reward_params/names'].tolist(), arrays['reward_params/values'].tolist()))
+        epsilon, steps_done, green_duration, last_action = arrays['counters'].tolist()
+        self.epsilon = epsilon
+        self.steps_done = int(steps_done)
+        self.current_green_duration = int(green_duration)
+        self.last_light_state = LIGHT_STATES[int(last_action)] if last_action >= 0 else None
+        self.episode_rewards = arrays['episode_rewards'].tolist()
+        self.episode_wait_times = arrays['episode_wait_times'].tolist()
 
     def count_queue_exit(self, queues_before, queues_after, light_state):
         light_dir, _ = light_state
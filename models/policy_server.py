@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+import torch
+from .base_model import BaseTrafficLightModel, LIGHT_STATES
+
+class PolicyServer:
+    """Answer greedy-action queries from many simulations with batched forward passes.
+
+    A server thread waits for the first pending query, then keeps collecting
+    more until max_batch are pending or max_latency seconds have passed since
+    the first one arrived, and evaluates them all in one pass of `network`.
+    Queries can come from threads (predict), asyncio tasks (predict_async) or
+    other processes on the same host through the clients returned by
+    connect(), which talk to the server over multiprocessing.Manager queues.
+
+        with PolicyServer(model.model) as server:
+            action = server.predict(state)
+    """
+    def __init__(self, network, max_batch=64, max_latency=0.002, device='cpu'):
+        self.network = network
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.device = device
+        self.batches = 0
+        self.queries = 0
+
+        self._pending = queue.Queue()
+        self._thread = None
+        self._manager = None
+        self._remote_requests = None
+        self._remote_responses = {}
+        self._client_ids = itertools.count()
+        self._pump = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, name='policy-server', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._pending.put(None)
+        self._thread.join()
+        if self._manager is not None:
+            self._remote_requests.put(None)
+            self._pump.join()
+            self._manager.shutdown()
+            self._manager = None
+
+    def submit(self, state):
+        """Queue a state vector; returns a Future for its action index"""
+        future = Future()
+        self._pending.put((np.asarray(state, dtype=np.float32), future, time.perf_counter()))
+        return future
+
+    def predict(self, state):
+        return self.submit(state).result()
+
+    async def predict_async(self, state):
+        return await asyncio.wrap_future(self.submit(state))
+
+    def connect(self):
+        """A picklable PolicyClient for use in another process"""
+        if self._manager is None:
+            from multiprocessing import Manager
+            self._manager = Manager()
+            self._remote_requests = self._manager.Queue()
+            self._pump = threading.Thread(target=self._forward_remote, name='policy-pump', daemon=True)
+            self._pump.start()
+        client_id = next(self._client_ids)
+        responses = self._manager.Queue()
+        self._remote_responses[client_id] = responses
+        return PolicyClient(client_id, self._remote_requests, responses)
+
+    def _forward_remote(self):
+        """Move queries from remote clients onto the local queue and send the answers back"""
+        while True:
+            request = self._remote_requests.get()
+            if request is None:
+                return
+            client_id, state = request
+            responses = self._remote_responses[client_id]
+            self.submit(state).add_done_callback(lambda future, responses=responses: responses.put(
+                future.exception() or future.result()))
+
+    def _serve(self):
+        while True:
+            first = self._pending.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = first[2] + self.max_latency
+            stopping = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                states = torch.from_numpy(np.stack([state for state, _, _ in batch])).to(self.device)
+                with torch.no_grad():
+                    actions = torch.argmax(self.network(states), dim=1).tolist()
+            except Exception as error:
+                # Fail this batch's queries rather than leave them waiting, and keep serving
+                for _, future, _ in batch:
+                    future.set_exception(error)
+            else:
+                for (_, future, _), action in zip(batch, actions):
+                    future.set_result(action)
+            self.batches += 1
+            self.queries += len(batch)
+            if stopping:
+                return
+
+class PolicyClient:
+    """Query a PolicyServer from another process; returned by PolicyServer.connect()"""
+    def __init__(self, client_id, requests, responses):
+        self.client_id = client_id
+        self.requests = requests
+        self.responses = responses
+
+    def predict(self, state):
+        self.requests.put((self.client_id, np.asarray(state, dtype=np.float32)))
+        response = self.responses.get()
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+class ServedModel(BaseTrafficLightModel):
+    """Traffic light model that asks a PolicyServer (or PolicyClient) for greedy actions"""
+    def __init__(self, config, policy):
+        super().__init__(config)
+        self.policy = policy
+
+    def get_light_state(self, time_step, queues):
+        return LIGHT_STATES[self.policy.predict(self.queue_state(queues))]
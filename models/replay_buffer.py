@@ -0,0 +1,98 @@
+import threading
+import numpy as np
+import torch
+
+class ReplayBuffer:
+    """Experience replay memory in preallocated tensors.
+
+    Transitions are written row by row at a cursor that wraps around, so once
+    capacity transitions are stored the oldest one is overwritten, like a
+    deque with maxlen. Nothing is allocated per transition, which keeps
+    capacities in the millions cheap. sample() draws row indices uniformly
+    (with replacement) from its own torch.Generator; without a seed, one is
+    drawn from the global NumPy RNG, so seed_everything() keeps training
+    repeatable. add() and sample() may be called from different threads.
+    """
+    def __init__(self, capacity, state_size, device='cpu', seed=None):
+        if seed is None:
+            seed = int(np.random.randint(0, 2**63 - 1, dtype=np.int64))
+        self.capacity = capacity
+        self.device = device
+        self.generator = torch.Generator().manual_seed(seed)
+
+        self.states = torch.zeros((capacity, state_size), dtype=torch.float32, device=device)
+        self.actions = torch.zeros(capacity, dtype=torch.long, device=device)
+        self.rewards = torch.zeros(capacity, dtype=torch.float32, device=device)
+        self.next_states = torch.zeros((capacity, state_size), dtype=torch.float32, device=device)
+        self.dones = torch.zeros(capacity, dtype=torch.float32, device=device)
+        self.cursor = 0
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def clear(self):
+        self.cursor = 0
+        self.size = 0
+
+    def add(self, state, action, reward, next_state, done):
+        with self.lock:
+            i = self.cursor
+            self.states[i] = state
+            self.actions[i] = action
+            self.rewards[i] = float(reward)
+            self.next_states[i] = next_state
+            self.dones[i] = float(done)
+            self.cursor = (i + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """(states, actions, rewards, next_states, dones) for batch_size random transitions"""
+        with self.lock:
+            rows = torch.randint(0, self.size, (batch_size,), generator=self.generator).to(self.device)
+            return self.states[rows], self.actions[rows], self.rewards[rows], self.next_states[rows], self.dones[rows]
+
+    def _ordered_rows(self):
+        """Row indices from the oldest to the newest transition"""
+        start = self.cursor if self.size == self.capacity else 0
+        return (torch.arange(self.size) + start) % self.capacity
+
+    def to_arrays(self):
+        """Stored transitions, oldest first, plus the sampler state as NumPy arrays"""
+        rows = self._ordered_rows().to(self.device)
+        return {
+            'states': self.states[rows].cpu().numpy(),
+            'actions': self.actions[rows].cpu().numpy(),
+            'rewards': self.rewards[rows].cpu().numpy().astype(np.float64),
+            'next_states': self.next_states[rows].cpu().numpy(),
+            'dones': self.dones[rows].cpu().numpy().astype(bool),
+            'cursor': np.array(self.cursor),
+            'sampler_state': self.generator.get_state().numpy(),
+        }
+
+    def load_arrays(self, arrays):
+        """Replace the contents with transitions written by to_arrays, keeping the newest that fit"""
+        count = min(len(arrays['states']), self.capacity)
+        tail = slice(len(arrays['states']) - count, None)
+        # A full buffer goes back into the same rows, so seeded sampling picks the same transitions
+        start = int(arrays.get('cursor', 0)) % self.capacity if count == self.capacity else 0
+        rows = ((torch.arange(count) + start) % self.capacity).to(self.device)
+        self.states[rows] = torch.as_tensor(arrays['states'][tail], dtype=torch.float32, device=self.device)
+        self.actions[rows] = torch.as_tensor(arrays['actions'][tail], dtype=torch.long, device=self.device)
+        self.rewards[rows] = torch.as_tensor(arrays['rewards'][tail], dtype=torch.float32, device=self.device)
+        self.next_states[rows] = torch.as_tensor(arrays['next_states'][tail], dtype=torch.float32, device=self.device)
+        self.dones[rows] = torch.as_tensor(arrays['dones'][tail], dtype=torch.float32, device=self.device)
+        self.size = count
+        self.cursor = (start + count) % self.capacity
+        if 'sampler_state' in arrays:
+            self.generator.set_state(torch.from_numpy(arrays['sampler_state'].copy()))
@@ -0,0 +1,103 @@
+import numpy as np
+
+class WaitTimeTracker:
+    """Waiting time of queued vehicles from per-lane FIFO buffers of enqueue steps.
+
+    Each (direction, spawn lane) queue has a ring buffer holding the step at
+    which every car still in it arrived, oldest first. update() pushes the
+    step's arrivals and pops its departures, so the work per step depends on
+    the number of lanes and arrivals, not on how many cars are waiting, and
+    cars that leave need no cleanup. Running sums of the buffered steps give
+    the total waiting time per lane without walking the queues.
+    """
+    def __init__(self, shape, capacity=64):
+        self.shape = tuple(shape)
+        num_lanes = int(np.prod(self.shape))
+        self.enqueued = np.zeros((num_lanes, capacity), dtype=np.int64)
+        self.heads = np.zeros(num_lanes, dtype=np.int64)
+        self.counts = np.zeros(num_lanes, dtype=np.int64)
+        self.step_sums = np.zeros(num_lanes, dtype=np.int64)
+        # Totals over the cars that have left their queue
+        self.departed = 0
+        self.departed_wait = 0
+
+    def reset(self):
+        self.heads[:] = 0
+        self.counts[:] = 0
+        self.step_sums[:] = 0
+        self.departed = 0
+        self.departed_wait = 0
+
+    def _grow(self, needed):
+        capacity = self.enqueued.shape[1]
+        while capacity < needed:
+            capacity *= 2
+        # Unwrap every lane so its oldest entry sits in column 0
+        columns = (self.heads[:, None] + np.arange(self.enqueued.shape[1])) % self.enqueued.shape[1]
+        unwrapped = np.take_along_axis(self.enqueued, columns, axis=1)
+        self.enqueued = np.zeros((len(self.heads), capacity), dtype=np.int64)
+        self.enqueued[:, :unwrapped.shape[1]] = unwrapped
+        self.heads[:] = 0
+
+    def update(self, time_step, arrivals, departures):
+        """Record one step: arrivals joined their queues, then departures left from the front"""
+        arrivals = arrivals.reshape(-1)
+        departures = departures.reshape(-1)
+        if arrivals.any():
+            needed = int((self.counts + arrivals).max())
+            if needed > self.enqueued.shape[1]:
+                self._grow(needed)
+            capacity = self.enqueued.shape[1]
+            for lane in np.flatnonzero(arrivals):
+                n = arrivals[lane]
+                slots = (self.heads[lane] + self.counts[lane] + np.arange(n)) % capacity
+                self.enqueued[lane, slots] = time_step
+                self.counts[lane] += n
+                self.step_sums[lane] += n * time_step
+
+        if departures.any():
+            capacity = self.enqueued.shape[1]
+            for lane in np.flatnonzero(departures):
+                n = min(int(departures[lane]), int(self.counts[lane]))
+                slots = (self.heads[lane] + np.arange(n)) % capacity
+                left = int(self.enqueued[lane, slots].sum())
+                self.heads[lane] = (self.heads[lane] + n) % capacity
+                self.counts[lane] -= n
+                self.step_sums[lane] -= left
+                self.departed += n
+                self.departed_wait += n * time_step - left
+
+    def lane_waits(self, time_step):
+        """Total steps waited so far by the cars in each queue, as a (directions, lanes) array"""
+        return (self.counts * time_step - self.step_sums).reshape(self.shape)
+
+    def oldest_waits(self, time_step):
+        """Steps waited by the car at the front of each queue (0 for empty queues)"""
+        fronts = self.enqueued[np.arange(len(self.heads)), self.heads]
+        return np.where(self.counts > 0, time_step - fronts, 0).reshape(self.shape)
+
+    def average_departed_wait(self):
+        return self.departed_wait / self.departed if self.departed else 0.0
+
+    def to_arrays(self):
+        """Queued enqueue steps lane by lane (oldest first), per-lane counts and totals"""
+        capacity = self.enqueued.shape[1]
+        steps = [self.enqueued[lane, (self.heads[lane] + np.arange(self.counts[lane])) % capacity]
+                 for lane in range(len(self.heads))]
+        return {
+            'enqueued': np.concatenate(steps) if steps else np.zeros(0, dtype=np.int64),
+            'counts': self.counts.copy(),
+            'departed': np.array([self.departed, self.departed_wait], dtype=np.int64),
+        }
+
+    def load_arrays(self, arrays):
+        counts = arrays['counts'].astype(np.int64)
+        capacity = max(self.enqueued.shape[1], int(counts.max(initial=0)))
+        self.enqueued = np.zeros((len(counts), capacity), dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        for lane, count in enumerate(counts):
+            self.enqueued[lane, :count] = arrays['enqueued'][offsets[lane]:offsets[lane + 1]]
+        self.heads[:] = 0
+        self.counts[:] = counts
+        self.step_sums[:] = self.enqueued.sum(axis=1)
+        self.departed, self.departed_wait = (int(v) for v in arrays['departed'])
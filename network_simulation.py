@@ -0,0 +1,81 @@
+import numpy as np
+from vector_simulation import VectorTrafficSimulation
+
+# Grid step (row, column) to the neighbour on each side; rows grow southwards
+_SIDE_OFFSETS = {'N': (-1, 0), 'S': (1, 0), 'E': (0, 1), 'W': (0, -1)}
+_OPPOSITE = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
+
+class NetworkSimulation(VectorTrafficSimulation):
+    """A rows x cols grid of intersections connected by road links.
+
+    Every intersection is one environment of a VectorTrafficSimulation. A
+    vehicle that leaves an intersection towards a neighbour joins that
+    neighbour's queue on the facing approach link_delay steps later, picking
+    its next lane with turn_probs (over config.spawn_lane_types). Vehicles
+    leaving towards the edge of the grid leave the network. New vehicles are
+    only generated on the approaches at the edge of the grid.
+
+    cars_exited counts vehicles that crossed each intersection, network_exits
+    the vehicles that left the network.
+    """
+    def __init__(self, traffic_model, traffic_generator, config, rows, cols, link_delay=10, turn_probs=None, seed=None):
+        super().__init__(traffic_model, traffic_generator, config, rows * cols, seed=seed)
+        if link_delay < 1:
+            raise ValueError("link_delay must be at least one step")
+        self.rows = rows
+        self.cols = cols
+        self.link_delay = link_delay
+
+        num_lanes = len(config.spawn_lane_types)
+        if turn_probs is None:
+            turn_probs = np.full(num_lanes, 1 / num_lanes)
+        self.turn_probs = np.asarray(turn_probs, dtype=float)
+
+        # neighbors[k, side] is the intersection reached by leaving k through side, or -1 at the edge
+        num_dirs = len(config.directions)
+        self.neighbors = np.full((self.num_envs, num_dirs), -1, dtype=np.int64)
+        for k in range(self.num_envs):
+            row, col = divmod(k, cols)
+            for side, d in enumerate(config.directions):
+                dr, dc = _SIDE_OFFSETS[d]
+                if 0 <= row + dr < rows and 0 <= col + dc < cols:
+                    self.neighbors[k, side] = (row + dr) * cols + col + dc
+
+        # Approach a vehicle enters the neighbour from, per exit side
+        self.entry_approach = np.array([config.directions.index(_OPPOSITE[d]) for d in config.directions])
+        # Only approaches without an upstream intersection get external demand
+        self.boundary = self.neighbors < 0
+
+        # Vehicles on the links, slot t % link_delay holds the ones arriving at step t
+        self.in_transit = np.zeros((link_delay, self.num_envs, num_dirs, num_lanes), dtype=np.int32)
+        self.cars_spawned = 0
+        self.network_exits = 0
+
+    def _spawn(self):
+        spawned = self.arrival_stream.counts(self.time_step) * self.boundary[:, :, None]
+        self.queue_counts += spawned
+        self.cars_spawned += int(spawned.sum())
+
+        slot = self.in_transit[self.time_step % self.link_delay]
+        self.queue_counts += slot
+        slot[:] = 0
+
+    def _handle_exits(self):
+        super()._handle_exits()
+
+        vehicles = self.vehicles
+        sides = vehicles.routes.exit_sides[vehicles.exited_route_ids]
+        targets = self.neighbors[vehicles.exited_env_ids, sides]
+        handed_off = targets >= 0
+        self.network_exits += int(np.count_nonzero(~handed_off))
+
+        targets = targets[handed_off]
+        approaches = self.entry_approach[sides[handed_off]]
+        lanes = self.rng.choice(len(self.turn_probs), size=len(targets), p=self.turn_probs)
+        # This step's slot has already been emptied and is read again link_delay steps from now
+        slot = self.in_transit[self.time_step % self.link_delay]
+        np.add.at(slot, (targets, approaches, lanes), 1)
+
+    @property
+    def vehicles_in_transit(self):
+        return int(self.in_transit.sum())
@@ -1,20 +1,39 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import matplotlib.animation as animation
 import numpy as np
-from entities.car import Car
-from utils.visualization import setup_visualization, update_visualization
-from models.neural_network import NeuralNetworkModel
+from entities.car import CarPool
+from entities.routes import HEADING_CONFLICTS
+from entities.vehicle_store import VehicleStore
+from utils.collision import collision_pairs
+from utils.profiling import PhaseProfiler
+from utils.snapshot import save_snapshot
+from utils.video import render_offscreen
 
 class TrafficSimulation:
-    def __init__(self, traffic_model, traffic_generator, config):
+    def __init__(self, traffic_model, traffic_generator, config, seed=None):
         self.model = traffic_model
+        # Models that learn online (the neural network) get rewards and replay each step
+        self._learning = hasattr(traffic_model, 'remember')
         self.traffic = traffic_generator
         self.config = config
         self.time_step = 0
         self.queues = {d: {l: [] for l in config.spawn_lane_types} for d in config.directions}
-        self.active_cars = []
+
+        # Queue lengths per (direction, spawn lane), kept in sync with self.queues,
+        # plus the cars that joined and left each queue during the current step
+        shape = (len(config.directions), len(config.spawn_lane_types))
+        self.queue_counts = np.zeros(shape, dtype=np.int64)
+        self.arrivals = np.zeros(shape, dtype=np.int64)
+        self.departures = np.zeros(shape, dtype=np.int64)
+        self._queue_index = [
+            (i, j, self.queues[d][l])
+            for i, d in enumerate(config.directions)
+            for j, l in enumerate(config.spawn_lane_types)
+        ]
+        # Finished cars are recycled for new arrivals
+        self.car_pool = CarPool(config)
+        self.vehicles = VehicleStore(config, pool=self.car_pool)
         self.collision_count = 0
+        # This run's arrival counts, seeded independently of the generator's other users
+        self.arrival_stream = traffic_generator.arrival_stream(seed)
         
         self._visualization_initialized = False
         self.fig = None
@@ -23,71 +42,172 @@ class TrafficSimulation:
         self.light_patches = None
 
         self.cars_exited = 0
+        self.light_state = None
+
+        # Optional per-step trace recorder (see utils.trace.TraceRecorder)
+        self.recorder = None
+        # Per-phase timing of update(), off until self.profiler.enable()
+        self.profiler = PhaseProfiler(label=f"{type(traffic_model).__name__}/{type(traffic_generator).__name__}")
+
+    @property
+    def active_cars(self):
+        """In-flight cars as Car objects, synced from the vehicle store"""
+        return self.vehicles.car_views()
+
+    @property
+    def active_car_count(self):
+        return self.vehicles.size
+
+    def vehicle_arrays(self):
+        """Positions and route ids of the in-flight vehicles, as views into the vehicle store"""
+        n = self.vehicles.size
+        return self.vehicles.positions[:n], self.vehicles.route_ids[:n]
 
     def _init_visualization(self):
         """Initialize visualization components if not already initialized"""
         if not self._visualization_initialized:
+            from utils.visualization import setup_visualization
             self.fig, self.ax, self.scat, self.light_patches, self.text_counters = setup_visualization(self.config) # Unpack text_counters as well
             self._visualization_initialized = True
 
     def update(self, frame):
+        profiler = self.profiler if self.profiler.enabled else None
+        if profiler:
+            profiler.start_step()
+
         self.time_step += 1
-        # Store the queues before processing
-        previous_queues = {d: {l: list(q) for l, q in direction_queues.items()} 
-                        for d, direction_queues in self.queues.items()}
-        
-        self.traffic.spawn_cars(self.time_step, self.queues)
+        self.departures[:] = 0
 
-        collision_detected = self._check_collisions()
+        self._spawn(self.arrival_stream.counts(self.time_step))
+        if profiler:
+            profiler.lap('spawn')
 
-        if isinstance(self.model, NeuralNetworkModel):
-            state = self.model.get_state(self.queues)
+        collision_detected = self._check_collisions()
+        if profiler:
+            profiler.lap('collisions')
 
-        light_state = self.model.get_light_state(self.time_step, self.queues)
+        if self._learning:
+            state = self.model.get_state(self.queue_counts)
+            light_state = self.model.get_light_state(self.time_step, self.queues, state=state)
+        else:
+            light_state = self.model.get_light_state(self.time_step, self.queues)
         allowed_dirs = ['N', 'S'] if light_state[0] == 'NS' else ['E', 'W']
+        self.light_state = light_state
+        if profiler:
+            profiler.lap('inference')
 
         self._process_movements(light_state, allowed_dirs)
+        if profiler:
+            profiler.lap('movements')
 
-        if isinstance(self.model, NeuralNetworkModel):
-            self.model.update_wait_times(self.queues, light_state, self.time_step)
+        reward = float('nan')
+        if self._learning:
+            self.model.update_wait_times(self.arrivals, self.departures, self.time_step)
             reward, avg_wait = self.model.calculate_reward(
-                self.queues, 
+                self.queue_counts,
                 light_state, 
                 collision_detected,
-                previous_queues  # Pass the previous queues state
+                departures=self.departures
             )
-            next_state = self.model.get_state(self.queues)
+            next_state = self.model.get_state(self.queue_counts)
             done = False
             self.model.remember(state, self._light_state_to_action(light_state),
                             reward, next_state, done)
+            if profiler:
+                profiler.lap('bookkeeping')
             self.model.replay()
-            self.model.cleanup_wait_times(self.active_cars, self.queues)
+            if profiler:
+                profiler.lap('replay')
+
+        if self.recorder is not None:
+            self.recorder.record(self, self._light_state_to_action(light_state), reward)
+            if profiler:
+                profiler.lap('recording')
 
         if self._visualization_initialized:
+            from utils.visualization import update_visualization
             update_visualization(
                 self.ax, self.scat, self.light_patches,
                 self.active_cars, light_state, allowed_dirs,
                 self.time_step, self.config,
                 self.queues, self.text_counters 
             )
+            if profiler:
+                profiler.lap('visualization')
+
+        if profiler:
+            profiler.end_step()
         
-    def run(self):
-        """Run with visualization"""
-        self._init_visualization()
-        
-        anim = animation.FuncAnimation(
-            self.fig, 
-            self.update, 
-            interval=500,
-            cache_frame_data=False,
-            save_count=1000
-        )
-        plt.show()
+    def run(self, steps_per_second=2.0, target_fps=30):
+        """Run with visualization until the window is closed (see utils.visualization.LiveRenderer)"""
+        from utils.visualization import LiveRenderer
+        renderer = LiveRenderer(self.config, target_fps=target_fps)
+        self.fig, self.ax, self.scat, self.light_patches = renderer.fig, renderer.ax, renderer.scat, renderer.light_patches
+        renderer.run(self, steps_per_second=steps_per_second)
     
-    def run_headless(self, steps=1000):
-        """Run without visualization"""
-        for _ in range(steps):
+    def run_offscreen(self, output, steps=1000, every=1, fps=10, workers=None):
+        """Render every Nth step to a video file or PNG directory without a display (see utils.video)"""
+        return render_offscreen(self, output, steps=steps, every=every, fps=fps, workers=workers)
+
+    def run_headless(self, steps=1000, checkpoint_every=None, checkpoint_path=None):
+        """Run without visualization.
+
+        With checkpoint_every set, a snapshot is written to checkpoint_path every
+        that many steps (checkpoint_path may contain '{step}' to keep them all).
+        """
+        if checkpoint_every and checkpoint_path is None:
+            raise ValueError("checkpoint_every needs a checkpoint_path")
+        for step in range(1, steps + 1):
             self.update(None)
+            if checkpoint_every and step % checkpoint_every == 0:
+                save_snapshot(self, checkpoint_path.format(step=self.time_step))
+
+        if self.profiler.enabled:
+            print(self.profiler.report())
+
+    def snapshot_arrays(self):
+        """Simulation and model state as a flat dict of NumPy arrays (see utils.snapshot)"""
+        n = self.vehicles.size
+        arrays = {
+            'time_step': np.array(self.time_step),
+            'cars_exited': np.array(self.cars_exited),
+            'collision_count': np.array(self.collision_count),
+            'queue_counts': self.queue_counts.copy(),
+            'vehicles/route_ids': self.vehicles.route_ids[:n].copy(),
+            'vehicles/positions': self.vehicles.positions[:n].copy(),
+        }
+        if self.arrival_stream.seed is not None:
+            arrays['arrivals/seed'] = np.array(self.arrival_stream.seed)
+        if hasattr(self.model, 'snapshot_arrays'):
+            for key, value in self.model.snapshot_arrays().items():
+                arrays['model/' + key] = value
+        return arrays
+
+    def restore_arrays(self, arrays):
+        """Restore state written by snapshot_arrays into this simulation"""
+        self.time_step = int(arrays['time_step'])
+        self.cars_exited = int(arrays['cars_exited'])
+        self.collision_count = int(arrays['collision_count'])
+        if 'arrivals/seed' in arrays:
+            # Arrivals depend only on the seed and the step, so the restored run sees the same traffic
+            self.arrival_stream = self.traffic.arrival_stream(int(arrays['arrivals/seed']))
+
+        # Queued cars have not moved yet, so their (direction, lane) is all there is to them
+        self.queue_counts[:] = arrays['queue_counts']
+        num_lanes = len(self.config.spawn_lane_types)
+        for i, j, queue in self._queue_index:
+            queue[:] = [self.car_pool.acquire(i * num_lanes + j) for _ in range(self.queue_counts[i, j])]
+
+        self.vehicles.clear()
+        for route, position in zip(arrays['vehicles/route_ids'], arrays['vehicles/positions']):
+            car = self.car_pool.acquire(int(route))
+            car.position[:] = position
+            self.vehicles.add(car)
+
+        if hasattr(self.model, 'restore_arrays'):
+            prefix = 'model/'
+            model_arrays = {key[len(prefix):]: value for key, value in arrays.items() if key.startswith(prefix)}
+            self.model.restore_arrays(model_arrays)
 
     def _light_state_to_action(self, light_state):
         """Convert light state to action index"""
@@ -100,56 +220,50 @@ class TrafficSimulation:
         else:
             return 3
         
+    def _spawn(self, counts):
+        """Queue counts[i, j] new cars at direction i, spawn lane j"""
+        num_lanes = len(self.config.spawn_lane_types)
+        for i, j in zip(*np.nonzero(counts)):
+            route = i * num_lanes + j  # same order as _queue_index
+            queue = self._queue_index[route][2]
+            queue.extend(self.car_pool.acquire(route) for _ in range(counts[i, j]))
+        self.arrivals[:] = counts
+        self.queue_counts += counts
+
+    def _release(self, d, lane):
+        """Move the first car of a queue into the intersection"""
+        self.vehicles.add(self.queues[d][lane].pop(0))
+        i = self.config.directions.index(d)
+        j = self.config.spawn_lane_types.index(lane)
+        self.queue_counts[i, j] -= 1
+        self.departures[i, j] += 1
+
     def _process_movements(self, light_state, allowed_dirs):
         light_dir, light_lane = light_state
         
         for d in allowed_dirs:
             if light_lane == 'left' and self.queues[d]['left']:
-                self.active_cars.append(self.queues[d]['left'].pop(0))
+                self._release(d, 'left')
             elif light_lane == 'straight':
                 if self.queues[d]['straight_forward']:
-                    self.active_cars.append(self.queues[d]['straight_forward'].pop(0))
+                    self._release(d, 'straight_forward')
                 if self.queues[d]['right']:
-                    self.active_cars.append(self.queues[d]['right'].pop(0))
-        
-        remaining_cars = []
-        for car in self.active_cars:
-            car.move()
-            if car.finished:
-                self.cars_exited += 1
-            else: 
-                remaining_cars.append(car)
-                
-        self.active_cars = remaining_cars
+                    self._release(d, 'right')
+
+        self._advance_vehicles()
+
+    def _advance_vehicles(self):
+        """Move every in-flight car one step and count the ones that finished"""
+        self.cars_exited += self.vehicles.advance(self.config.car_speed)
 
     def _check_collisions(self):
         """Check for cars that are too close and moving in different directions"""
-        collision_detected = False
-        
-        for i, car1 in enumerate(self.active_cars):
-            for j, car2 in enumerate(self.active_cars[i+1:], i+1):
-                # Check distance threshold
-                distance = np.linalg.norm(car1.position - car2.position)
-                if distance < self.config.collision_threshold:
-                    # Check if cars are moving in significantly different directions
-                    angle_diff = self._get_angle_difference(car1.cardinal_direction, car2.cardinal_direction)
-                    
-                    # Only consider it a collision if directions differ by more than 45 degrees
-                    if angle_diff > 45:
-                        #print(f"Collision detected at timestep {self.time_step}:")
-                        #print(f"- Car from {car1.origin} moving {car1.cardinal_direction} at {car1.position}")
-                        #print(f"- Car from {car2.origin} moving {car2.cardinal_direction} at {car2.position}")
-                        #print(f"Distance: {distance:.2f}, Angle difference: {angle_diff:.1f}°")
-                        self.collision_count += 1
-                        collision_detected = True
-                        
-        return collision_detected
-
-    def _get_angle_difference(self, dir1, dir2):
-        """Calculate angle between two cardinal directions (N,S,E,W)"""
-        directions = {'N': 90, 'S': 270, 'E': 0, 'W': 180}
-        angle1 = directions.get(dir1, 0)
-        angle2 = directions.get(dir2, 0)
-        diff = abs(angle1 - angle2)
-        
-        return min(diff, 360 - diff)  # Get smallest angle difference
+        vehicles = self.vehicles
+        i, _ = collision_pairs(
+            vehicles.positions[:vehicles.size],
+            vehicles.headings[:vehicles.size],
+            self.config.collision_threshold,
+            HEADING_CONFLICTS
+        )
+        self.collision_count += len(i)
+        return len(i) > 0
@@ -1,9 +1,12 @@
 """Traffic generation patterns package."""
 
+from .arrivals import ArrivalStream
 from .base_traffic import BaseTrafficGenerator
 from .random_traffic import RandomTrafficGenerator
+from .replay_traffic import ReplayStream, ReplayTrafficGenerator
+from .scenarios import ScenarioTapes, TapeTrafficGenerator
 
 # Future traffic generators would be imported here
 # from .peak_traffic import PeakTrafficGenerator
 
-__all__ = ['BaseTrafficGenerator', 'RandomTrafficGenerator']
\ No newline at end of file
+__all__ = ['ArrivalStream', 'BaseTrafficGenerator', 'RandomTrafficGenerator', 'ReplayStream', 'ReplayTrafficGenerator', 'ScenarioTapes', 'TapeTrafficGenerator']
\ No newline at end of file
@@ -0,0 +1,60 @@
+import numpy as np
+
+ARRIVAL_PROCESSES = ('bernoulli', 'poisson')
+
+# Draws per pre-generated block; the block length in steps shrinks for wide batches
+_BLOCK_DRAWS = 1 << 20
+
+class ArrivalStream:
+    """Seeded arrival counts for one simulation, pre-generated in blocks of steps.
+
+    rate_table is a (period, directions, spawn lanes) array; step t uses row
+    t % period as the Bernoulli probability or Poisson mean of an arrival in
+    each lane. counts(t) returns an integer array of shape
+    batch_shape + (directions, spawn lanes), e.g. batch_shape=(num_envs,) for
+    a VectorTrafficSimulation.
+
+    Every block is drawn from its own Generator, seeded from (seed, block
+    number), so the counts for a step depend only on the seed and the step:
+    streams rebuilt from the same seed replay the same arrivals, in any order.
+    Without a seed one is drawn from the global NumPy RNG, so seed_everything()
+    still makes runs repeatable.
+    """
+    def __init__(self, rate_table, seed=None, process='bernoulli', batch_shape=(), block_size=1024):
+        if process not in ARRIVAL_PROCESSES:
+            raise ValueError(f"Unknown arrival process {process!r}, expected one of {ARRIVAL_PROCESSES}")
+        if seed is None:
+            seed = int(np.random.randint(0, 2**63 - 1, dtype=np.int64))
+
+        self.rate_table = np.asarray(rate_table, dtype=float)
+        self.seed = seed
+        self.process = process
+        self.batch_shape = tuple(batch_shape)
+
+        draws_per_step = int(np.prod(self.batch_shape + self.rate_table.shape[1:], dtype=np.int64))
+        self.block_size = max(1, min(block_size, _BLOCK_DRAWS // max(draws_per_step, 1)))
+        self._block_index = None
+        self._block = None
+
+    def _draw_block(self, index):
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(index,)))
+        steps = np.arange(index * self.block_size, (index + 1) * self.block_size)
+        rates = self.rate_table[steps % len(self.rate_table)]
+        # (steps, directions, lanes) -> (steps, *batch, directions, lanes)
+        rates = rates.reshape((len(steps),) + (1,) * len(self.batch_shape) + rates.shape[1:])
+        shape = (len(steps),) + self.batch_shape + self.rate_table.shape[1:]
+
+        if self.process == 'bernoulli':
+            block = (rng.random(shape) < rates).astype(np.int32)
+        else:
+            block = rng.poisson(np.broadcast_to(rates, shape)).astype(np.int32)
+        block.flags.writeable = False
+        self._block_index = index
+        self._block = block
+
+    def counts(self, time_step):
+        """Arrivals per lane at time_step (read-only view into the current block)"""
+        index, row = divmod(time_step, self.block_size)
+        if index != self._block_index:
+            self._draw_block(index)
+        return self._block[row]
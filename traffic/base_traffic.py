@@ -1,7 +1,42 @@
+import numpy as np
+from .arrivals import ArrivalStream
+from entities.car import Car
+
 class BaseTrafficGenerator:
-    def __init__(self, config):
+    """Spawns cars from a per-step rate for each (direction, spawn lane).
+
+    Child classes implement spawn_probabilities(); arrivals are drawn as
+    Bernoulli trials with those probabilities, or as Poisson counts with them
+    as means when process='poisson'. Simulations take their own seeded
+    arrival_stream() from the generator, so one generator can be shared by
+    many runs.
+    """
+    # Steps after which spawn_probabilities() repeats
+    rate_period = 1
+
+    def __init__(self, config, process='bernoulli'):
         self.config = config
-        
+        self.process = process
+        self._stream = None
+
     def spawn_cars(self, time_step, queues):
-        """To be implemented by child classes"""
-        raise NotImplementedError
\ No newline at end of file
+        """Append this step's arrivals to queues, drawn from the generator's own stream"""
+        if self._stream is None:
+            self._stream = self.arrival_stream()
+        counts = self._stream.counts(time_step)
+        for i, j in zip(*np.nonzero(counts)):
+            d = self.config.directions[i]
+            lane = self.config.spawn_lane_types[j]
+            queues[d][lane].extend(Car(d, lane, self.config) for _ in range(counts[i, j]))
+
+    def spawn_probabilities(self, time_step):
+        """Per-step spawn probability for each (direction, spawn lane), as a (directions, lanes) array"""
+        raise NotImplementedError
+
+    def rate_table(self):
+        """spawn_probabilities() for one period, as a (rate_period, directions, lanes) array"""
+        return np.stack([self.spawn_probabilities(t) for t in range(self.rate_period)])
+
+    def arrival_stream(self, seed=None, batch_shape=()):
+        """A fresh ArrivalStream of arrival counts per step (see traffic.arrivals)"""
+        return ArrivalStream(self.rate_table(), seed=seed, process=self.process, batch_shape=batch_shape)
@@ -1,10 +1,10 @@
-import random
+import numpy as np
 from .base_traffic import BaseTrafficGenerator
-from entities.car import Car
 
 class RandomTrafficGenerator(BaseTrafficGenerator):
-    def spawn_cars(self, time_step, queues):
-        for d in self.config.directions:
-            for lane in self.config.spawn_lane_types:
-                if random.random() < 0.2:
-                    queues[d][lane].append(Car(d, lane, self.config))
\ No newline at end of file
+    def __init__(self, config, spawn_prob=0.2, process='bernoulli'):
+        super().__init__(config, process=process)
+        self.spawn_prob = spawn_prob
+
+    def spawn_probabilities(self, time_step):
+        return np.full((len(self.config.directions), len(self.config.spawn_lane_types)), self.spawn_prob)
@@ -0,0 +1,141 @@
+import itertools
+import os
+import numpy as np
+from .base_traffic import BaseTrafficGenerator
+
+class _NpySource:
+    """Rows of a (rows, directions, lanes) count array, memory-mapped from a .npy file"""
+    def __init__(self, path, shape):
+        data = np.load(path, mmap_mode='r')
+        self.data = data.reshape((len(data),) + shape)
+        self.rows = len(self.data)
+
+    def row(self, index):
+        return self.data[index] if index < self.rows else None
+
+class _CsvSource:
+    """Rows of a CSV file of counts, parsed chunk_rows lines at a time.
+
+    Only the current chunk is held in memory, and the file is only open while
+    a chunk is read. The byte offset of every chunk seen so far is remembered,
+    so seeking back (e.g. when looping) does not re-read the file from the
+    start. rows stays None until the end is reached.
+    """
+    def __init__(self, path, config, chunk_rows):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.shape = (len(config.directions), len(config.spawn_lane_types))
+        self.rows = None
+
+        with open(path, 'rb') as f:
+            first = f.readline().decode()
+            header_end = f.tell()
+        names = [f"{d}_{lane}" for d in config.directions for lane in config.spawn_lane_types]
+        fields = [field.strip() for field in first.split(',')]
+        if all(name in fields for name in names):
+            # Header row: pick the count columns by name, ignore any others (timestamps, detector ids...)
+            self.columns = [fields.index(name) for name in names]
+            self.chunk_offsets = [header_end]
+        else:
+            self.columns = None
+            self.chunk_offsets = [0]
+        self.chunk_index = None
+        self.chunk = None
+
+    def _read_chunk(self, index):
+        with open(self.path, 'rb') as f:
+            while len(self.chunk_offsets) <= index:
+                # Skip ahead chunk by chunk, recording where each one starts
+                f.seek(self.chunk_offsets[-1])
+                skipped = sum(1 for _ in itertools.islice(f, self.chunk_rows))
+                if skipped < self.chunk_rows:
+                    self.rows = (len(self.chunk_offsets) - 1) * self.chunk_rows + skipped
+                    return None
+                self.chunk_offsets.append(f.tell())
+
+            f.seek(self.chunk_offsets[index])
+            lines = [line.decode() for line in itertools.islice(f, self.chunk_rows)]
+            if len(lines) < self.chunk_rows:
+                self.rows = index * self.chunk_rows + len(lines)
+                if not lines:
+                    return None
+            elif len(self.chunk_offsets) == index + 1:
+                self.chunk_offsets.append(f.tell())
+
+        chunk = np.loadtxt(lines, delimiter=',', ndmin=2, usecols=self.columns, dtype=np.int64)
+        self.chunk_index = index
+        self.chunk = chunk.reshape((len(chunk),) + self.shape)
+        return self.chunk
+
+    def row(self, index):
+        if self.rows is not None and index >= self.rows:
+            return None
+        chunk_index, offset = divmod(index, self.chunk_rows)
+        chunk = self.chunk if chunk_index == self.chunk_index else self._read_chunk(chunk_index)
+        if chunk is None or offset >= len(chunk):
+            return None
+        return chunk[offset]
+
+class ReplayStream:
+    """Arrival counts per step replayed from a recorded demand trace.
+
+    Row r of the trace holds the arrivals for steps r * interval + 1 through
+    (r + 1) * interval. Interval totals are spread evenly over their steps, so
+    a replay is exact and needs no seed. After the last row the trace starts
+    over if loop is set, otherwise nothing more arrives.
+    """
+    seed = None
+
+    def __init__(self, source, shape, interval=1, start=0, loop=False, batch_shape=()):
+        self.source = source
+        self.shape = shape
+        self.interval = interval
+        self.start = start
+        self.loop = loop
+        self.batch_shape = tuple(batch_shape)
+        self._empty = np.zeros(shape, dtype=np.int64)
+
+    def counts(self, time_step):
+        index, step = divmod(time_step - 1, self.interval)
+        index += self.start
+        row = self.source.row(index)
+        if row is None and self.loop and self.source.rows:
+            row = self.source.row(index % self.source.rows)
+        if row is None:
+            row = self._empty
+        elif self.interval > 1:
+            row = (step + 1) * row // self.interval - step * row // self.interval
+        return np.broadcast_to(row, self.batch_shape + self.shape)
+
+class ReplayTrafficGenerator(BaseTrafficGenerator):
+    """Replay recorded arrival counts per (direction, spawn lane) from a file.
+
+    path is either a .npy array of shape (rows, directions, lanes) or
+    (rows, directions * lanes), which is memory-mapped, or a CSV file with one
+    row of counts per interval, which is streamed chunk_rows lines at a time.
+    A CSV header may name the count columns '<direction>_<lane>' (e.g.
+    'N_left', 'N_straight_forward'); other columns are ignored. Without a
+    header the columns must be the counts in config order, direction-major.
+    Each row covers `interval` simulation steps and replay starts at row
+    `start`. Every simulation opens the file on its own, so one generator can
+    drive many runs, and memory use does not grow with the trace length.
+    """
+    def __init__(self, config, path, interval=1, start=0, loop=False, chunk_rows=4096):
+        super().__init__(config)
+        self.path = path
+        self.interval = interval
+        self.start = start
+        self.loop = loop
+        self.chunk_rows = chunk_rows
+
+    def _open(self):
+        shape = (len(self.config.directions), len(self.config.spawn_lane_types))
+        if os.path.splitext(self.path)[1].lower() == '.npy':
+            return _NpySource(self.path, shape)
+        return _CsvSource(self.path, self.config, self.chunk_rows)
+
+    def arrival_stream(self, seed=None, batch_shape=()):
+        """A ReplayStream over the trace; seed is ignored since replay is deterministic"""
+        shape = (len(self.config.directions), len(self.config.spawn_lane_types))
+        return ReplayStream(self._open(), shape, interval=self.interval, start=self.start,
+                            loop=self.loop, batch_shape=batch_shape)
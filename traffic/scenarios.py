@@ -0,0 +1,112 @@
+import os
+import numpy as np
+from .base_traffic import BaseTrafficGenerator
+from .replay_traffic import ReplayStream
+
+class _TapeSource:
+    """Rows (steps) of one or more scenarios of a memory-mapped tape array"""
+    def __init__(self, data, scenarios):
+        self.data = data
+        self.scenarios = scenarios
+        self.rows = data.shape[1]
+
+    def row(self, index):
+        return self.data[self.scenarios, index] if index < self.rows else None
+
+class ScenarioTapes:
+    """Pre-recorded arrival counts for a fixed set of seeded scenarios.
+
+    The tapes are one (scenarios, steps, directions, lanes) .npy array:
+    record() draws scenario i from traffic_generator.arrival_stream() with a
+    seed derived from (seed, i), the arrivals a simulation seeded that way
+    would see. The file is memory-mapped wherever it is opened, so processes
+    evaluating in parallel share the pages instead of each holding or
+    regenerating the demand.
+
+    Replaying the same tapes to every model under test (common random
+    numbers) means differences between models come from the models, not from
+    the traffic they happened to draw, so fewer runs are needed to tell them
+    apart. Pickled tapes carry only their path.
+    """
+    def __init__(self, config, path):
+        self.config = config
+        self.path = path
+        self._data = None
+
+    @classmethod
+    def record(cls, traffic_generator, path, num_scenarios, num_steps, seed=0):
+        """Write num_scenarios tapes of num_steps steps from traffic_generator to path"""
+        from utils.parallel import task_seed
+
+        config = traffic_generator.config
+        shape = (num_scenarios, num_steps, len(config.directions), len(config.spawn_lane_types))
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tapes = np.lib.format.open_memmap(path, mode='w+', dtype=np.int32, shape=shape)
+        for i in range(num_scenarios):
+            stream = traffic_generator.arrival_stream(task_seed(seed, i))
+            for t in range(num_steps):
+                # Row t holds the arrivals of step t + 1, as ReplayStream expects
+                tapes[i, t] = stream.counts(t + 1)
+        tapes.flush()
+        del tapes
+        return cls(config, path)
+
+    @classmethod
+    def load_or_record(cls, traffic_generator, path, num_scenarios, num_steps, seed=0):
+        """Open the tapes at path, recording them first unless at least the requested ones exist.
+
+        The file is not keyed by the generator or seed; use a different path
+        for different demand.
+        """
+        if os.path.exists(path):
+            tapes = cls(traffic_generator.config, path)
+            if tapes.num_scenarios >= num_scenarios and tapes.num_steps >= num_steps:
+                return tapes
+        return cls.record(traffic_generator, path, num_scenarios, num_steps, seed)
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = np.load(self.path, mmap_mode='r')
+        return self._data
+
+    @property
+    def num_scenarios(self):
+        return self.data.shape[0]
+
+    @property
+    def num_steps(self):
+        return self.data.shape[1]
+
+    def __len__(self):
+        return self.num_scenarios
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_data'] = None
+        return state
+
+    def scenario(self, index):
+        """Traffic generator replaying scenario `index`"""
+        return TapeTrafficGenerator(self, index)
+
+    def batch(self, count=None):
+        """Traffic generator replaying the first `count` scenarios (all by default) side by side,
+        for a VectorTrafficSimulation with num_envs=count"""
+        return TapeTrafficGenerator(self, slice(0, count if count is not None else self.num_scenarios))
+
+class TapeTrafficGenerator(BaseTrafficGenerator):
+    """Replays one scenario of a ScenarioTapes, or a slice of them as a batch.
+
+    Arrivals stop after the last recorded step. Replay is deterministic, so
+    the seed passed to arrival_stream() is ignored.
+    """
+    def __init__(self, tapes, scenarios):
+        super().__init__(tapes.config)
+        self.tapes = tapes
+        self.scenarios = scenarios
+
+    def arrival_stream(self, seed=None, batch_shape=()):
+        shape = (len(self.config.directions), len(self.config.spawn_lane_types))
+        return ReplayStream(_TapeSource(self.tapes.data, self.scenarios), shape, batch_shape=batch_shape)
@@ -1,5 +1,20 @@
 """Utility functions and helpers package."""
 
-from .visualization import setup_visualization, update_visualization
+from .collision import collision_pairs
+from .model_store import ModelStore
+from .parallel import iter_parallel, run_parallel, seed_everything, task_seed
+from .profiling import PhaseProfiler
+from .snapshot import load_snapshot, read_snapshot, save_snapshot
+from .trace import TraceRecorder, load_trace
+from .video import render_offscreen
 
-__all__ = ['setup_visualization', 'update_visualization']
\ No newline at end of file
+# Drawing needs matplotlib, which is slow to import; load it on first use
+_VISUALIZATION = ('LiveRenderer', 'draw_frame', 'setup_visualization', 'update_visualization')
+
+def __getattr__(name):
+    if name in _VISUALIZATION:
+        from . import visualization
+        return getattr(visualization, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['collision_pairs', 'ModelStore', 'iter_parallel', 'run_parallel', 'seed_everything', 'task_seed', 'PhaseProfiler', 'load_snapshot', 'read_snapshot', 'save_snapshot', 'TraceRecorder', 'load_trace', 'render_offscreen', 'draw_frame', 'LiveRenderer', 'setup_visualization', 'update_visualization']
\ No newline at end of file
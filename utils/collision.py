@@ -0,0 +1,71 @@
+import numpy as np
+
+# Below this many vehicles a dense pairwise check is cheaper than building the grid
+DENSE_LIMIT = 64
+
+# Half of the 3x3 neighbourhood, so every pair of adjacent cells is visited once
+_NEIGHBOR_OFFSETS = [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+def collision_pairs(positions, headings, threshold, conflicts, groups=None):
+    """Find pairs of vehicles that are closer than threshold with conflicting headings.
+
+    positions is an (N, 2) array, headings an (N,) array of integer heading codes
+    and conflicts a boolean table indexed by two heading codes. If groups is
+    given, only vehicles with the same group id (e.g. the same intersection)
+    can collide. Returns index arrays (i, j) with one entry per colliding pair.
+    """
+    n = len(positions)
+    if n < 2:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+
+    if n <= DENSE_LIMIT:
+        i, j = np.triu_indices(n, 1)
+        if groups is not None:
+            same = groups[i] == groups[j]
+            i, j = i[same], j[same]
+    else:
+        i, j = _grid_candidates(positions, threshold, groups)
+
+    distance = np.linalg.norm(positions[i] - positions[j], axis=1)
+    close = distance < threshold
+    i, j = i[close], j[close]
+    hit = conflicts[headings[i], headings[j]]
+    return i[hit], j[hit]
+
+def _grid_candidates(positions, threshold, groups=None):
+    """Candidate pairs from a uniform grid with cells of size threshold"""
+    cells = np.floor(positions / threshold).astype(np.int64)
+    cells -= cells.min(axis=0)
+    # Spare rows/columns keep the -1/+1 neighbours from aliasing into another column or group
+    stride = cells[:, 1].max() + 3
+    keys = cells[:, 0] * stride + cells[:, 1]
+    if groups is not None:
+        keys += groups.astype(np.int64) * ((cells[:, 0].max() + 3) * stride)
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    rank = np.arange(len(keys))
+
+    candidates_i = []
+    candidates_j = []
+    for dx, dy in _NEIGHBOR_OFFSETS:
+        neighbor = sorted_keys + dx * stride + dy
+        lo = np.searchsorted(sorted_keys, neighbor, side='left')
+        hi = np.searchsorted(sorted_keys, neighbor, side='right')
+        if dx == 0 and dy == 0:
+            lo = np.maximum(lo, rank + 1)
+        counts = np.maximum(hi - lo, 0)
+        total = counts.sum()
+        if total == 0:
+            continue
+        first = np.repeat(rank, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = np.repeat(lo, counts) + offsets
+        candidates_i.append(order[first])
+        candidates_j.append(order[second])
+
+    if not candidates_i:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    return np.concatenate(candidates_i), np.concatenate(candidates_j)
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from .snapshot import load_snapshot, save_snapshot
+
+# Bump when the layout of a store entry changes; older entries are then ignored
+STORE_VERSION = 1
+
+def _plain(value):
+    # NumPy scalars, e.g. parameters picked from np.linspace grids
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class ModelStore:
+    """Directory of trained models, one entry per reward parameters + training setup.
+
+    An entry is a subdirectory named after key(), holding the model's
+    snapshot (model.npz, see utils.snapshot) and meta.json with the reward
+    parameters, the training setup and how far training got. Models are saved
+    and restored through their snapshot_arrays()/restore_arrays(), so weights,
+    optimizer state, epsilon, reward_params and replay memory all carry over.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def key(self, reward_params, training):
+        """Stable id for a combination of reward parameters and training setup (plain JSON values)"""
+        description = json.dumps({'reward_params': reward_params, 'training': training}, sort_keys=True, default=_plain)
+        return hashlib.sha1(description.encode()).hexdigest()[:16]
+
+    def _path(self, key, name):
+        return os.path.join(self.directory, key, name)
+
+    def meta(self, key):
+        """The entry's metadata, or None if there is no usable entry for key"""
+        try:
+            with open(self._path(key, 'meta.json')) as f:
+                meta = json.load(f)
+        except OSError:
+            return None
+        if meta.get('format_version') != STORE_VERSION or not os.path.exists(self._path(key, 'model.npz')):
+            return None
+        return meta
+
+    def entries(self):
+        """Metadata of every usable entry, most recently updated first"""
+        if not os.path.isdir(self.directory):
+            return []
+        metas = [self.meta(key) for key in os.listdir(self.directory)
+                 if os.path.isdir(os.path.join(self.directory, key))]
+        return sorted((meta for meta in metas if meta), key=lambda meta: -meta['updated'])
+
+    def save(self, key, model, reward_params, training, **progress):
+        """Write model under key, with progress (e.g. episodes=3) recorded in its metadata"""
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+        save_snapshot(model, self._path(key, 'model.npz'))
+
+        meta = {
+            'format_version': STORE_VERSION,
+            'key': key,
+            'model': type(model).__name__,
+            'reward_params': reward_params,
+            'training': training,
+            'updated': time.time(),
+        }
+        meta.update(progress)
+        tmp_path = self._path(key, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2, sort_keys=True, default=_plain)
+        os.replace(tmp_path, self._path(key, 'meta.json'))
+
+    def load(self, key, model):
+        """Restore the entry for key into model; returns its metadata, or None if there is none"""
+        meta = self.meta(key)
+        if meta is None:
+            return None
+        load_snapshot(self._path(key, 'model.npz'), model)
+        return meta
@@ -0,0 +1,74 @@
+import os
+import pickle
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+def task_seed(base_seed, *keys):
+    """Derive an independent, deterministic seed for one task from a base seed and its keys"""
+    return int(np.random.SeedSequence([base_seed, *keys]).generate_state(1)[0])
+
+def seed_everything(seed):
+    """Seed every random number generator a simulation run draws from"""
+    random.seed(seed)
+    np.random.seed(seed)
+    if 'torch' in sys.modules:
+        sys.modules['torch'].manual_seed(seed)
+
+def _single_torch_thread():
+    """Limit torch (if loaded) to one intra-op thread; returns the previous count or None"""
+    torch = sys.modules.get('torch')
+    if torch is None:
+        return None
+    num_threads = torch.get_num_threads()
+    # One intra-op thread per worker, so N workers don't oversubscribe the cores
+    # and results don't depend on how many threads torch picks
+    torch.set_num_threads(1)
+    return num_threads
+
+def _init_worker():
+    _single_torch_thread()
+
+def _run_pickled(payload, inline=False):
+    fn, task = pickle.loads(payload)
+    # Unpickling the task may have imported torch: spawn and forkserver
+    # workers start without it, so the initializer had nothing to limit
+    num_threads = _single_torch_thread()
+    try:
+        return fn(*task)
+    finally:
+        if inline and num_threads is not None:
+            sys.modules['torch'].set_num_threads(num_threads)
+
+def iter_parallel(fn, tasks, workers=None):
+    """Run fn(*task) for every task and yield (index, result) pairs as they finish.
+
+    workers=None uses one process per core, workers=1 runs the tasks in this
+    process. Every task gets its own by-value copy of its arguments, pickled
+    with the plain pickler: the multiprocessing pickler would move torch
+    tensors to shared memory, so a model trained by one task would leak into
+    the others. Tasks should seed themselves (see seed_everything) so results
+    don't depend on the worker count or completion order.
+    """
+    payloads = [pickle.dumps((fn, task)) for task in tasks]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        for index, payload in enumerate(payloads):
+            yield index, _run_pickled(payload, inline=True)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(_run_pickled, payload): index for index, payload in enumerate(payloads)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def run_parallel(fn, tasks, workers=None):
+    """Run fn(*task) for every task and return the results in task order"""
+    tasks = list(tasks)
+    results = [None] * len(tasks)
+    for index, result in iter_parallel(fn, tasks, workers):
+        results[index] = result
+    return results
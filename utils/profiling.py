@@ -0,0 +1,99 @@
+import json
+import random
+from time import perf_counter_ns
+import numpy as np
+
+class PhaseProfiler:
+    """Accumulate wall time and call counts per phase of TrafficSimulation.update.
+
+    Disabled by default; the simulation only touches the clock while enabled,
+    so it can be switched on and off at any time with enable()/disable().
+    Per-phase percentiles come from a fixed-size reservoir sample of
+    max_samples durations, so memory stays bounded on long runs.
+    """
+    def __init__(self, label=None, max_samples=100_000):
+        self.label = label
+        self.max_samples = max_samples
+        self.enabled = False
+        self._rng = random.Random(0)  # keeps sampling off the global RNG
+        self.reset()
+
+    def reset(self):
+        self.totals = {}
+        self.counts = {}
+        self.samples = {}
+        self.steps = 0
+        self.step_time = 0
+        self._step_start = 0
+        self._last = 0
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def start_step(self):
+        self._step_start = self._last = perf_counter_ns()
+
+    def lap(self, phase):
+        """Charge the time since the previous lap (or the step start) to phase"""
+        now = perf_counter_ns()
+        duration = now - self._last
+        self._last = now
+
+        count = self.counts.get(phase, 0) + 1
+        self.counts[phase] = count
+        self.totals[phase] = self.totals.get(phase, 0) + duration
+
+        samples = self.samples.setdefault(phase, [])
+        if len(samples) < self.max_samples:
+            samples.append(duration)
+        else:
+            slot = self._rng.randrange(count)
+            if slot < self.max_samples:
+                samples[slot] = duration
+
+    def end_step(self):
+        self.steps += 1
+        self.step_time += perf_counter_ns() - self._step_start
+
+    def to_dict(self):
+        """Summary in plain types, times in seconds"""
+        phases = {}
+        for phase, total in self.totals.items():
+            p50, p90, p99 = np.percentile(self.samples[phase], [50, 90, 99]) / 1e9
+            phases[phase] = {
+                'calls': self.counts[phase],
+                'total': total / 1e9,
+                'mean': total / self.counts[phase] / 1e9,
+                'p50': float(p50),
+                'p90': float(p90),
+                'p99': float(p99),
+                'share': total / self.step_time if self.step_time else 0.0,
+            }
+        return {
+            'label': self.label,
+            'steps': self.steps,
+            'total_time': self.step_time / 1e9,
+            'steps_per_sec': self.steps / (self.step_time / 1e9) if self.step_time else 0.0,
+            'phases': phases,
+        }
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def report(self):
+        summary = self.to_dict()
+        lines = [
+            f"{summary['label'] or 'simulation'}: {summary['steps']} steps in {summary['total_time']:.2f}s "
+            f"({summary['steps_per_sec']:.0f} steps/sec)",
+            f"{'phase':<14}{'calls':>9}{'total s':>10}{'share':>8}{'mean us':>10}{'p50 us':>9}{'p90 us':>9}{'p99 us':>9}",
+        ]
+        for phase, stats in sorted(summary['phases'].items(), key=lambda item: -item[1]['total']):
+            lines.append(
+                f"{phase:<14}{stats['calls']:>9}{stats['total']:>10.3f}{stats['share']:>8.1%}"
+                f"{stats['mean'] * 1e6:>10.1f}{stats['p50'] * 1e6:>9.1f}{stats['p90'] * 1e6:>9.1f}{stats['p99'] * 1e6:>9.1f}"
+            )
+        return '\n'.join(lines)
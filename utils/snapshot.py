@@ -0,0 +1,36 @@
+import os
+import numpy as np
+
+# Bump when the meaning of existing keys changes; readers refuse newer snapshots
+SNAPSHOT_VERSION = 1
+
+def save_snapshot(sim, path):
+    """Write the full state of a simulation (and its model, if it supports it) to path.
+
+    The snapshot is an uncompressed .npz of plain arrays, so it loads without
+    unpickling any objects. The file is written next to path and moved into
+    place, so an interrupted write never leaves a truncated checkpoint behind.
+    The global random number generators are not part of the snapshot.
+    """
+    arrays = sim.snapshot_arrays()
+    arrays['format_version'] = np.array(SNAPSHOT_VERSION)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+def read_snapshot(path):
+    """Read a snapshot into a dict of arrays, e.g. to restore it into several simulations"""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+
+    version = int(arrays.pop('format_version', -1))
+    if not 1 <= version <= SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot format version {version} in {path}")
+    return arrays
+
+def load_snapshot(path, sim):
+    """Restore a snapshot into sim, which must use the same config and model type"""
+    sim.restore_arrays(read_snapshot(path))
+    return sim
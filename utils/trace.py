@@ -0,0 +1,114 @@
+import json
+import os
+import numpy as np
+
+TRACE_HEADER = 'trace.json'
+
+def _trace_columns(config):
+    """(name, dtype, per-step shape) of every traced column"""
+    num_lanes = len(config.directions) * len(config.spawn_lane_types)
+    return [
+        ('time_step', np.int64, ()),
+        ('queue_counts', np.int32, (num_lanes,)),
+        ('action', np.int8, ()),
+        ('reward', np.float32, ()),
+        ('active_cars', np.int32, ()),
+        ('cars_exited', np.int64, ()),
+        ('collision_count', np.int64, ()),
+    ]
+
+class TraceRecorder:
+    """Record one fixed-width row per simulation step into per-column files.
+
+    Rows are collected in preallocated NumPy buffers of chunk_size steps and
+    appended to one raw file per column (memory-mapped at the end of the file)
+    whenever a buffer fills up. trace.json describes the columns and the
+    number of rows flushed so far; load_trace() maps the files back without
+    reading them into memory. Attach with `sim.recorder = TraceRecorder(...)`
+    and close() when done. The action column uses LIGHT_STATES indices and
+    reward is NaN for models that don't compute one.
+    """
+    def __init__(self, directory, config, chunk_size=65536):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.columns = _trace_columns(config)
+        self.buffers = {name: np.zeros((chunk_size,) + shape, dtype=dtype) for name, dtype, shape in self.columns}
+        self.rows_buffered = 0
+        self.rows_written = 0
+
+        os.makedirs(directory, exist_ok=True)
+        for name, _, _ in self.columns:
+            open(self._column_path(name), 'wb').close()
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, name + '.bin')
+
+    def record(self, sim, action, reward):
+        """Append the state of sim after its current step"""
+        row = self.rows_buffered
+        buffers = self.buffers
+        buffers['time_step'][row] = sim.time_step
+        buffers['queue_counts'][row] = sim.queue_counts.reshape(-1)
+        buffers['action'][row] = action
+        buffers['reward'][row] = reward
+        buffers['active_cars'][row] = sim.active_car_count
+        buffers['cars_exited'][row] = sim.cars_exited
+        buffers['collision_count'][row] = sim.collision_count
+
+        self.rows_buffered = row + 1
+        if self.rows_buffered == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered rows to the column files"""
+        n = self.rows_buffered
+        if n == 0:
+            return
+        for name, dtype, shape in self.columns:
+            row_bytes = np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+            # r+ grows the file to fit the mapped region
+            mapped = np.memmap(self._column_path(name), dtype=dtype, mode='r+',
+                               offset=self.rows_written * row_bytes, shape=(n,) + shape)
+            mapped[:] = self.buffers[name][:n]
+            mapped.flush()
+            del mapped
+        self.rows_written += n
+        self.rows_buffered = 0
+        self._write_header()
+
+    def close(self):
+        self.flush()
+
+    def _write_header(self):
+        header = {
+            'rows': self.rows_written,
+            'columns': [
+                {'name': name, 'dtype': np.dtype(dtype).str, 'shape': list(shape)}
+                for name, dtype, shape in self.columns
+            ],
+        }
+        with open(os.path.join(self.directory, TRACE_HEADER), 'w') as f:
+            json.dump(header, f)
+
+def load_trace(directory):
+    """Map a recorded trace as a dict of read-only column arrays"""
+    with open(os.path.join(directory, TRACE_HEADER)) as f:
+        header = json.load(f)
+
+    rows = header['rows']
+    trace = {}
+    for column in header['columns']:
+        shape = (rows,) + tuple(column['shape'])
+        if rows == 0:
+            trace[column['name']] = np.zeros(shape, dtype=column['dtype'])
+        else:
+            path = os.path.join(directory, column['name'] + '.bin')
+            trace[column['name']] = np.memmap(path, dtype=column['dtype'], mode='r', shape=shape)
+    return trace
@@ -0,0 +1,125 @@
+import os
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.mov', '.avi', '.webm', '.gif')
+
+# Per-process renderer state, set up once by _init_renderer
+_renderer = None
+
+def _init_renderer(config, dpi):
+    """Build an offscreen Agg figure for this process, without touching pyplot"""
+    global _renderer
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from utils.visualization import setup_visualization
+
+    fig = Figure(figsize=(10, 10), dpi=dpi)
+    FigureCanvasAgg(fig)
+    _, ax, scat, light_patches, text_counters = setup_visualization(config, fig=fig)
+    _renderer = (config, fig, ax, scat, light_patches, text_counters)
+
+def _render_frame(frame, path=None):
+    """Rasterize one captured frame; save it as a PNG at path, or return its RGB pixels"""
+    from utils.visualization import draw_frame
+
+    config, fig, ax, scat, light_patches, text_counters = _renderer
+    time_step, positions, colors, light_state, queue_counts = frame
+    draw_frame(ax, scat, light_patches, text_counters, positions, colors, light_state, time_step, config, queue_counts)
+    if path is not None:
+        fig.savefig(path)
+        return None
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba())[:, :, :3].copy()
+
+def capture_frame(sim):
+    """Everything needed to draw the current state of sim, as plain data"""
+    cars = sim.active_cars
+    positions = np.array([car.position for car in cars]).reshape(-1, 2)
+    colors = [car.color for car in cars]
+    return sim.time_step, positions, colors, sim.light_state, sim.queue_counts.copy()
+
+class _InlineExecutor:
+    """Stand-in for a process pool that renders in this process"""
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+def render_offscreen(sim, output, steps=1000, every=1, fps=10, workers=None, dpi=80):
+    """Run sim headless for steps and render every Nth step without a display.
+
+    If output ends in a video extension the frames are piped to ffmpeg,
+    otherwise output is a directory that receives frame_000001.png, ...
+    Frames are rasterized by `workers` processes (one per core by default,
+    0 to render in this process) while the simulation keeps running; at most
+    a few frames per worker are in flight, so memory stays bounded.
+    Returns the number of frames written.
+    """
+    is_video = output.lower().endswith(VIDEO_EXTENSIONS)
+    encoder = None
+    if is_video:
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError("ffmpeg is required to write video files; use a directory for PNG frames")
+    else:
+        os.makedirs(output, exist_ok=True)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 0:
+        _init_renderer(sim.config, dpi)
+        executor = _InlineExecutor()
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_renderer, initargs=(sim.config, dpi))
+    max_pending = 4 * max(workers, 1)
+
+    pending = deque()
+    frames = 0
+
+    def write(future):
+        nonlocal encoder
+        pixels = future.result()
+        if not is_video:
+            return
+        if encoder is None:
+            height, width, _ = pixels.shape
+            # Most codecs need even frame sizes in yuv420p
+            encoding = [] if output.lower().endswith('.gif') else \
+                ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p']
+            encoder = subprocess.Popen(
+                ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                 '-s', f'{width}x{height}', '-r', str(fps), '-i', '-'] + encoding + [output],
+                stdin=subprocess.PIPE
+            )
+        encoder.stdin.write(pixels.tobytes())
+
+    try:
+        with executor:
+            for step in range(1, steps + 1):
+                sim.update(None)
+                if step % every:
+                    continue
+
+                frames += 1
+                path = None if is_video else os.path.join(output, f'frame_{frames:06d}.png')
+                pending.append(executor.submit(_render_frame, capture_frame(sim), path))
+                while len(pending) >= max_pending:
+                    write(pending.popleft())
+
+            while pending:
+                write(pending.popleft())
+    finally:
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
+
+    return frames
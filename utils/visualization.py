@@ -1,10 +1,17 @@
+import warnings
+from time import perf_counter
 import matplotlib.pyplot as plt
+from matplotlib.backend_bases import FigureManagerBase
 import matplotlib.patches as patches
+from matplotlib.colors import to_rgba
 import numpy as np
 
-def setup_visualization(config):
-    """Initialize the visualization components"""
-    fig, ax = plt.subplots(figsize=(10, 10))
+def setup_visualization(config, fig=None):
+    """Initialize the visualization components, on a new pyplot figure unless fig is given"""
+    if fig is None:
+        fig, ax = plt.subplots(figsize=(10, 10))
+    else:
+        ax = fig.add_subplot()
     ax.set_xlim(-5, 5)
     ax.set_ylim(-5, 5)
     scat = ax.scatter([], [], s=80)
@@ -67,16 +74,28 @@ def setup_visualization(config):
 
 def update_visualization(ax, scat, light_patches, active_cars, light_state, allowed_dirs, time_step, config, queues, text_counters):
     """Update all visualization elements for each frame"""
-    # Update car positions
-    positions = [car.position for car in active_cars]
+    positions = np.array([car.position for car in active_cars]).reshape(-1, 2)
     colors = [car.color for car in active_cars]
-    x, y = zip(*positions) if positions else ([], [])
-    scat.set_offsets(np.column_stack((x, y)))
+    queue_counts = np.array([[len(queues[d][lane]) for lane in config.spawn_lane_types] for d in config.directions])
+    draw_frame(ax, scat, light_patches, text_counters, positions, colors, light_state, time_step, config, queue_counts,
+               allowed_dirs=allowed_dirs)
+
+def draw_frame(ax, scat, light_patches, text_counters, positions, colors, light_state, time_step, config, queue_counts,
+               allowed_dirs=None):
+    """Set every visualization element from plain data: an (N, 2) position array,
+    N car colors and a (directions, spawn lanes) queue count array. The lights
+    show allowed_dirs as green, by default the directions of light_state."""
+    # Update car positions
+    scat.set_offsets(positions)
     scat.set_color(colors)
 
     # Update traffic lights
     light_dir, light_lane = light_state
-    for d in config.directions:
+    if allowed_dirs is None:
+        allowed_dirs = ['N', 'S'] if light_dir == 'NS' else ['E', 'W']
+    left = config.spawn_lane_types.index('left')
+    straight = [config.spawn_lane_types.index('straight_forward'), config.spawn_lane_types.index('right')]
+    for i, d in enumerate(config.directions):
         if d in allowed_dirs:
             if light_lane == 'left':
                 light_patches[d]['left'].set_color('green')
@@ -89,8 +108,156 @@ def update_visualization(ax, scat, light_patches, active_cars, light_state, allo
             light_patches[d]['straight'].set_color('red')
 
         # Update car counts
-        text_counters[d]['left'].set_text(str(len(queues[d]['left'])))
-        text_counters[d]['straight'].set_text(str(len(queues[d]['straight_forward']) + len(queues[d]['right']))) # Combine straight and right
+        text_counters[d]['left'].set_text(str(queue_counts[i, left]))
+        text_counters[d]['straight'].set_text(str(queue_counts[i, straight].sum())) # Combine straight and right
 
     # Update title with current time and light state
-    ax.set_title(f"Time {time_step} | Light: {light_dir}-{light_lane}")
\ No newline at end of file
+    ax.set_title(f"Time {time_step} | Light: {light_dir}-{light_lane}")
+
+class LiveRenderer:
+    """Blitted on-screen renderer for a running simulation.
+
+    The static scene (roads, lane markers, labels) is drawn once and cached.
+    The lights and queue counters are drawn into a second cached layer that
+    is only rebuilt when one of them changes, so a typical frame restores that
+    layer and draws just the cars and the title. Car offsets and colors are
+    written into preallocated arrays that grow by doubling.
+
+    Frames are paced to target_fps, and drawing never takes more than about
+    half of the wall clock: on a dense scene or a slow display the simulation
+    keeps stepping and the frames in between are skipped.
+    """
+    def __init__(self, config, target_fps=30, fig=None):
+        self.config = config
+        self.frame_interval = 1.0 / target_fps
+        self.fig, self.ax, self.scat, self.light_patches, self.text_counters = setup_visualization(config, fig=fig)
+        # ax.set_title sits outside the axes patch; a Text in axes coordinates blits like any other artist
+        self.title = self.ax.text(0.5, 1.01, '', transform=self.ax.transAxes, ha='center', va='bottom', fontsize=12)
+        # Lights live in the cached layer, so cars are drawn on top of them
+        self.scat.set_zorder(4)
+
+        self._layer_artists = [artist for lanes in self.light_patches.values() for artist in lanes.values()] + \
+            [artist for lanes in self.text_counters.values() for artist in lanes.values()]
+        for artist in self._layer_artists + [self.scat, self.title]:
+            artist.set_animated(True)
+
+        self._route_rgba = np.array([to_rgba(color) for color in config.route_table().colors])
+        self._offsets = np.zeros((64, 2))
+        self._colors = np.zeros((64, 4))
+
+        self._left = config.spawn_lane_types.index('left')
+        self._straight = [config.spawn_lane_types.index('straight_forward'), config.spawn_lane_types.index('right')]
+        self._shown_light = None
+        self._shown_counts = None
+
+        self._background = None
+        self._layer = None
+        self._next_frame = 0.0
+        self.frames_drawn = 0
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        """A full redraw (first show, resize) invalidates both cached layers"""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._layer = None
+
+    def _set_lights(self, light_state):
+        light_dir, light_lane = light_state
+        allowed_dirs = ['N', 'S'] if light_dir == 'NS' else ['E', 'W']
+        for d in self.config.directions:
+            green = d in allowed_dirs
+            self.light_patches[d]['left'].set_color('green' if green and light_lane == 'left' else 'red')
+            self.light_patches[d]['straight'].set_color('green' if green and light_lane != 'left' else 'red')
+        self._shown_light = light_state
+        self._layer = None
+
+    def _set_counts(self, counts):
+        for i, d in enumerate(self.config.directions):
+            self.text_counters[d]['left'].set_text(str(counts[i, 0]))
+            self.text_counters[d]['straight'].set_text(str(counts[i, 1]))
+        self._shown_counts = counts
+        self._layer = None
+
+    def _set_cars(self, positions, route_ids):
+        n = len(positions)
+        if n > len(self._offsets):
+            capacity = len(self._offsets)
+            while capacity < n:
+                capacity *= 2
+            self._offsets = np.zeros((capacity, 2))
+            self._colors = np.zeros((capacity, 4))
+        offsets = self._offsets[:n]
+        colors = self._colors[:n]
+        offsets[:] = positions
+        np.take(self._route_rgba, route_ids, axis=0, out=colors)
+        self.scat.set_offsets(offsets)
+        self.scat.set_color(colors)
+
+    def draw_due(self, now):
+        return now >= self._next_frame
+
+    def draw(self, sim):
+        """Draw the current state of sim, touching only the artists whose values changed"""
+        start = perf_counter()
+        canvas = self.fig.canvas
+        if self._background is None:
+            canvas.draw()
+
+        if sim.light_state is not None and sim.light_state != self._shown_light:
+            self._set_lights(sim.light_state)
+        queue_counts = sim.queue_counts
+        counts = np.stack([queue_counts[:, self._left], queue_counts[:, self._straight].sum(axis=1)], axis=1)
+        if self._shown_counts is None or not np.array_equal(counts, self._shown_counts):
+            self._set_counts(counts)
+
+        if self._layer is None:
+            canvas.restore_region(self._background)
+            for artist in self._layer_artists:
+                self.fig.draw_artist(artist)
+            self._layer = canvas.copy_from_bbox(self.fig.bbox)
+        else:
+            canvas.restore_region(self._layer)
+
+        self._set_cars(*sim.vehicle_arrays())
+        if sim.light_state is not None:
+            self.title.set_text(f"Time {sim.time_step} | Light: {sim.light_state[0]}-{sim.light_state[1]}")
+        self.fig.draw_artist(self.scat)
+        self.fig.draw_artist(self.title)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+        end = perf_counter()
+        self._next_frame = max(start + self.frame_interval, end + (end - start))
+        self.frames_drawn += 1
+
+    def run(self, sim, steps_per_second=2.0, steps=None):
+        """Step sim at steps_per_second (None for as fast as possible) until the window
+        is closed or steps have run, drawing whenever a frame is due.
+
+        On a non-interactive backend (Agg, no display) there is no window to
+        close, so without steps this warns and returns at once, like plt.show().
+        """
+        manager = self.fig.canvas.manager
+        if steps is None and (manager is None or type(manager) is FigureManagerBase):
+            warnings.warn(f"Matplotlib backend {plt.get_backend()!r} is non-interactive; "
+                          "pass steps to run without a window", stacklevel=2)
+            return 0
+        step_interval = 1.0 / steps_per_second if steps_per_second else 0.0
+        plt.show(block=False)
+
+        taken = 0
+        next_step = perf_counter()
+        while plt.fignum_exists(self.fig.number) and (steps is None or taken < steps):
+            now = perf_counter()
+            if now >= next_step:
+                sim.update(None)
+                taken += 1
+                # After a stall, drop the backlog instead of racing to catch up
+                next_step = max(next_step + step_interval, now - self.frame_interval)
+            if self.draw_due(perf_counter()):
+                self.draw(sim)
+            else:
+                wait = min(next_step, self._next_frame) - perf_counter()
+                if wait > 0:
+                    self.fig.canvas.start_event_loop(wait)
+        return taken